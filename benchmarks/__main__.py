@@ -0,0 +1,71 @@
+"""Runs the benchmarks: python -m benchmarks [--compare baseline.json]"""
+
+import argparse
+import os
+import sys
+
+from src.headless import HeadlessCore
+
+from . import harness
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Times each room's hot paths, optionally against a baseline."
+    )
+    parser.add_argument("--rooms", type=int, nargs="*", help="default: all rooms")
+    parser.add_argument("--scales", type=int, nargs="*", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument(
+        "--compare",
+        nargs="?",
+        const=BASELINE,
+        help=f"compare with a results file (default: {BASELINE})",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="how much slower than the baseline is a regression (default: 0.25)",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help=f"write the results to {BASELINE}"
+    )
+    args = parser.parse_args()
+
+    core = HeadlessCore()
+    # the game's modules need the display the core opened
+    from src.room_cache import RoomCache
+
+    from . import rooms
+
+    room_ids = args.rooms or RoomCache.get_room_ids()
+    for scale in args.scales:
+        if scale not in rooms.SCALES:
+            parser.error(f"scale must be one of {sorted(rooms.SCALES)}")
+
+    results = rooms.run(core, room_ids, args.scales, args.repeat)
+
+    if args.output:
+        harness.save(results, args.output)
+    if args.save_baseline:
+        harness.save(results, BASELINE)
+
+    if args.compare:
+        regressions = harness.compare(
+            results, harness.load(args.compare), args.threshold
+        )
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+            return 1
+    elif not args.output:
+        for name, result in results.items():
+            print(f"{name:<40}{result['min_ms']:>10.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import platform
+import statistics
+import time
+import typing as t
+
+import pygame
+
+Result = dict[str, float]
+
+
+# rounds shorter than this are mostly timer and scheduler noise
+MIN_ROUND_TIME = 0.001
+
+
+def measure(
+    run: t.Callable[[], t.Any],
+    setup: t.Callable[[], t.Any] | None = None,
+    repeat: int = 5,
+    number: int = 1,
+    warmup: int = 1,
+    noise_ms: float = 0.0,
+) -> Result:
+    """Times `run`, returning milliseconds per call over `repeat` rounds.
+
+    `setup` is called, untimed, before each round of `number` calls. The first
+    `warmup` rounds fill caches and aren't counted, then `number` is doubled
+    until a round takes at least `MIN_ROUND_TIME`. `noise_ms` is how much
+    slower a call can get before `compare` believes it.
+    """
+
+    def time_round() -> float:
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        return time.perf_counter() - start
+
+    for _ in range(warmup):
+        time_round()
+    while time_round() < MIN_ROUND_TIME:
+        number *= 2
+
+    timings = [time_round() / number * 1000 for _ in range(repeat)]
+    return summarize(timings, noise_ms) | {"number": number}
+
+
+def summarize(timings: list[float], noise_ms: float = 0.0) -> Result:
+    return {
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+        "rounds": len(timings),
+        "noise_ms": noise_ms,
+    }
+
+
+def get_metadata() -> dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def save(results: dict[str, Result], path: str) -> None:
+    with open(path, "w") as file:
+        json.dump({"metadata": get_metadata(), "results": results}, file, indent=2)
+        file.write("\n")
+
+
+def load(path: str) -> dict[str, Result]:
+    with open(path) as file:
+        return json.load(file)["results"]
+
+
+def compare(
+    results: dict[str, Result], baseline: dict[str, Result], threshold: float
+) -> list[str]:
+    """Prints the change from `baseline` per benchmark and returns the names of
+    the ones more than `threshold` (a fraction) slower.
+
+    The fastest rounds are compared, the others only add noise from whatever
+    else the machine was doing. A benchmark also has to be more than its
+    `noise_ms` slower, so tiny ones don't fail over a few microseconds.
+    """
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None or not old["min_ms"]:
+            print(f"{name:<40}{result['min_ms']:>10.3f} ms   (new)")
+            continue
+
+        ratio = result["min_ms"] / old["min_ms"]
+        slower = result["min_ms"] - old["min_ms"]
+        flag = ""
+        if ratio > 1 + threshold and slower > result.get("noise_ms", 0.0):
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(
+            f"{name:<40}{result['min_ms']:>10.3f} ms"
+            f"{old['min_ms']:>10.3f} ms{ratio:>8.2f}x{flag}"
+        )
+    return regressions
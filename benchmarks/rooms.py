@@ -0,0 +1,253 @@
+"""Benchmarks of each room's hot paths.
+
+Importing the game's entities needs a display, so create a `HeadlessCore`
+before importing this module (see `__main__`).
+"""
+
+from __future__ import annotations
+
+import copy
+import itertools
+import random
+import time
+import typing as t
+
+import pygame
+
+import pytmx
+from src import shared
+from src.entities import Stone
+from src.enums import DoorDirection
+from src.gamestate import GameStateManager
+from src.graph import Graph
+from src.grid import Grid
+from src.headless import HeadlessCore
+from src.playstate import load_room
+from src.room_cache import RoomCache
+from src.spatial_hash import SpatialHash
+
+from .harness import Result, measure, summarize
+
+# times a room's area, and the (columns, rows) of copies of it that makes up
+SCALES = {1: (1, 1), 10: (5, 2), 100: (10, 10)}
+# Grid and frames draw the whole room into surfaces, which would take
+# gigabytes at 100x, so bigger rooms only time the logic
+MAX_DRAWN_SCALE = 10
+SEARCHES = 50
+PUSHES = 100
+FRAMES = 120
+WARMUP_FRAMES = 10
+# how many milliseconds the fastest round of each kind of benchmark moves by
+# between runs of the same code, in a 1x room; see `harness.compare`
+NOISE_MS = {
+    "load_entities": 2.0,
+    "graph.create_graph": 1.0,
+    "graph.search": 0.2,
+    "stone.push_chain": 0.03,
+    "load_room+grid": 10.0,
+    "frame": 1.5,
+}
+
+
+def scale_map(tiled_map: pytmx.TiledMap, columns: int, rows: int) -> pytmx.TiledMap:
+    """Returns `tiled_map` repeated `columns` by `rows` times.
+
+    Only the first copy keeps the player, and only doors that end up on the
+    edge of the bigger room are kept, the rest can't tell where they lead.
+    """
+    if (columns, rows) == (1, 1):
+        return tiled_map
+
+    types = {
+        gid: properties.get("type")
+        for gid, properties in tiled_map.tile_properties.items()
+    }
+    width = tiled_map.width * columns
+    height = tiled_map.height * rows
+
+    def keep(gid: int, x: int, y: int) -> bool:
+        tile_type = types.get(gid)
+        if tile_type == "player":
+            return x < tiled_map.width and y < tiled_map.height
+        if tile_type == "door":
+            # see Door.__init__
+            return y <= 1 or x <= 1 or x >= width - 2 or y >= height - 2
+        return True
+
+    scaled = copy.copy(tiled_map)
+    scaled.width, scaled.height = width, height
+    scaled.layers = []
+    for layer in tiled_map.layers:
+        if isinstance(layer, pytmx.TiledTileLayer):
+            original = [list(row) for row in layer.data]
+            data = []
+            for y in range(height):
+                row = original[y % tiled_map.height]
+                data.append(
+                    [
+                        gid if keep(gid, x, y) else 0
+                        for x, gid in enumerate(row * columns)
+                    ]
+                )
+            layer = copy.copy(layer)
+            layer.width, layer.height = width, height
+            layer.data = data
+        scaled.layers.append(layer)
+    return scaled
+
+
+def reset_room(room_id: int) -> None:
+    """Makes the next load of `room_id` a first visit."""
+    shared.room_id = room_id
+    shared.entities_in_room = {}
+    shared.next_door = DoorDirection.SOUTH
+
+
+def load_entities() -> None:
+    """Loads the current room's entities the way `Grid` does, minus drawing."""
+    grid = Grid.__new__(Grid)
+    grid.background = pygame.Surface((1, 1))
+    shared.entities = []
+    shared.spatial_hash = SpatialHash()
+    for _ in grid.load_entities_from_room():
+        pass
+    shared.graph = Graph()
+
+
+def find_push_run() -> list[pygame.Vector2]:
+    """Returns the longest row of empty cells, where a chain of stones fits."""
+    best: list[pygame.Vector2] = []
+    for row in range(shared.rows):
+        run: list[pygame.Vector2] = []
+        for col in range(shared.cols + 1):
+            if col < shared.cols and not shared.spatial_hash.get((col, row)):
+                run.append(pygame.Vector2(col, row))
+                continue
+            if len(run) > len(best):
+                best = run
+            run = []
+    return best
+
+
+def bench_graph(results: dict[str, Result], name: str, repeat: int) -> None:
+    results[f"{name}/graph.create_graph"] = measure(
+        shared.graph.create_graph,
+        repeat=repeat,
+        noise_ms=NOISE_MS["graph.create_graph"],
+    )
+
+    rng = random.Random(0)
+    cells = sorted(Graph.get_walkable_cells())
+    if len(cells) < 2:
+        return
+    pairs = itertools.cycle(
+        [tuple(rng.sample(cells, 2)) for _ in range(SEARCHES)]  # type: ignore
+    )
+    results[f"{name}/graph.search"] = measure(
+        lambda: shared.graph.search(*next(pairs)),
+        repeat=repeat,
+        number=SEARCHES,
+        noise_ms=NOISE_MS["graph.search"],
+    )
+
+
+def bench_push_chain(results: dict[str, Result], name: str, repeat: int) -> None:
+    run = find_push_run()
+    if len(run) < 2:
+        return
+
+    # the last cell stays free, so the whole chain can move
+    image = pygame.Surface(shared.TILE_SIZE, pygame.SRCALPHA)
+    stones = [Stone(cell, image, {"symbol": None}) for cell in run[:-1]]
+    for stone in stones:
+        shared.spatial_hash.add(stone)
+    try:
+        results[f"{name}/stone.push_chain"] = measure(
+            lambda: stones[0].request_direction((1, 0)),
+            repeat=repeat,
+            number=PUSHES,
+            noise_ms=NOISE_MS["stone.push_chain"],
+        )
+    finally:
+        for stone in stones:
+            shared.spatial_hash.remove(stone)
+
+
+def bench_frames(core: HeadlessCore, room_id: int) -> Result:
+    """Times full redraws of idle PlayState frames, restarting the room if the
+    player dies."""
+    dirty_rects = shared.DIRTY_RECTS
+    shared.DIRTY_RECTS = False
+    timings = []
+    try:
+        frame = 0
+        while len(timings) < FRAMES:
+            state = GameStateManager().state
+            if state is None or state.name != "PlayState":
+                reset_room(room_id)
+                GameStateManager().set_state("PlayState")
+                frame = 0
+                continue
+
+            start = time.perf_counter()
+            core.step()
+            if frame >= WARMUP_FRAMES:
+                timings.append((time.perf_counter() - start) * 1000)
+            frame += 1
+    finally:
+        shared.DIRTY_RECTS = dirty_rects
+    return summarize(timings, NOISE_MS["frame"])
+
+
+def bench_room(
+    core: HeadlessCore, room_id: int, scale: int, repeat: int
+) -> dict[str, Result]:
+    results: dict[str, Result] = {}
+    name = f"room-{room_id}" if scale == 1 else f"room-{room_id}x{scale}"
+    reset_room(room_id)
+    if scale > 1:
+        tiled_map = RoomCache().get_room_map(room_id)
+        RoomCache().add_room(room_id, scale_map(tiled_map, *SCALES[scale]))
+
+    try:
+        load_room()
+        results[f"{name}/load_entities"] = measure(
+            load_entities, repeat=repeat, noise_ms=NOISE_MS["load_entities"]
+        )
+        bench_graph(results, name, repeat)
+        bench_push_chain(results, name, repeat)
+
+        if scale <= MAX_DRAWN_SCALE:
+
+            def setup() -> None:
+                reset_room(room_id)
+                if scale == 1:
+                    # from the compiled room, like a room's first visit
+                    RoomCache().remove_room(room_id)
+
+            results[f"{name}/load_room+grid"] = measure(
+                lambda: (load_room(), Grid()),
+                setup,
+                repeat=repeat,
+                noise_ms=NOISE_MS["load_room+grid"],
+            )
+            reset_room(room_id)
+            GameStateManager().set_state("PlayState")
+            results[f"{name}/frame"] = bench_frames(core, room_id)
+    finally:
+        RoomCache().remove_room(room_id)
+        reset_room(room_id)
+    return results
+
+
+def run(
+    core: HeadlessCore,
+    room_ids: t.Iterable[int],
+    scales: t.Iterable[int],
+    repeat: int,
+) -> dict[str, Result]:
+    results: dict[str, Result] = {}
+    for room_id in room_ids:
+        for scale in scales:
+            results.update(bench_room(core, room_id, scale, repeat))
+    return results
@@ -24,14 +24,16 @@ import json
 import logging
 import os
 import struct
+import sys
 import zlib
+from array import array
 from base64 import b64decode
 from collections import defaultdict, namedtuple
 from copy import deepcopy
 from itertools import chain, product
 from math import cos, radians, sin
 from operator import attrgetter
-from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 from xml.etree import ElementTree
 
 # for type hinting
@@ -40,6 +42,12 @@ try:
 except ImportError:
     pygame = None
 
+# compiled maps are memory mapped when the platform allows it
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
 __all__ = (
     "TileFlags",
     "TiledElement",
@@ -48,11 +56,13 @@ __all__ = (
     "TiledObject",
     "TiledObjectGroup",
     "TiledTileLayer",
+    "TileLayerData",
     "TiledClassType",
     "TiledTileset",
     "convert_to_bool",
     "resolve_to_class",
     "parse_properties",
+    "read_compiled_metadata",
 )
 
 logger = logging.getLogger(__name__)
@@ -68,6 +78,11 @@ GID_TRANS_FLIPY = 1 << 30
 GID_TRANS_ROT = 1 << 29
 GID_MASK = GID_TRANS_FLIPX | GID_TRANS_FLIPY | GID_TRANS_ROT
 
+# compiled map format: header, JSON table, then each layer as uint32 LE gids
+COMPILED_MAGIC = b"TMXC"
+COMPILED_VERSION = 1
+compiled_header = struct.Struct("<4sII")  # magic, version, table size
+
 # error message format strings go here
 duplicate_name_fmt = (
     'Cannot set user {} property on {} "{}"; Tiled property already exists.'
@@ -79,6 +94,15 @@ AnimationFrame = namedtuple("AnimationFrame", ["gid", "duration"])
 Point = namedtuple("Point", ["x", "y"])
 TileFlags = namedtuple("TileFlags", flag_names)
 empty_flags = TileFlags(False, False, False)
+# every combination of flags, indexed by the internal TRANS_* bits
+flag_combinations = tuple(
+    TileFlags(bool(i & TRANS_FLIPX), bool(i & TRANS_FLIPY), bool(i & TRANS_ROT))
+    for i in range(8)
+)
+# the same flags, indexed by the top three bits of a Tiled gid
+gid_flag_combinations = tuple(
+    TileFlags(bool(i & 4), bool(i & 2), bool(i & 1)) for i in range(8)
+)
 ColorLike = Union[Tuple[int, int, int, int], Tuple[int, int, int], int, str]
 MapPoint = Tuple[int, int, int]
 TiledLayer = Union[
@@ -124,15 +148,7 @@ def decode_gid(raw_gid: int) -> Tuple[int, TileFlags]:
     """
     if raw_gid < GID_TRANS_ROT:
         return raw_gid, empty_flags
-    return (
-        raw_gid & ~GID_MASK,
-        # TODO: cache all combinations of flags
-        TileFlags(
-            raw_gid & GID_TRANS_FLIPX == GID_TRANS_FLIPX,
-            raw_gid & GID_TRANS_FLIPY == GID_TRANS_FLIPY,
-            raw_gid & GID_TRANS_ROT == GID_TRANS_ROT,
-        ),
-    )
+    return raw_gid & ~GID_MASK, gid_flag_combinations[raw_gid >> 29]
 
 
 def reshape_data(
@@ -156,7 +172,7 @@ def unpack_gids(
     text: str,
     encoding: Optional[str] = None,
     compression: Optional[str] = None,
-) -> List[int]:
+) -> array:
     """Return all gids from encoded/compressed layer data
 
     Args:
@@ -165,7 +181,7 @@ def unpack_gids(
         compression (Optional[str]): Compression used.
 
     Returns:
-        List[int]: List of all the GIDs in the layer.
+        array: uint32 array of all the GIDs in the layer.
 
     """
     if encoding == "base64":
@@ -176,14 +192,128 @@ def unpack_gids(
             data = zlib.decompress(data)
         elif compression:
             raise ValueError(f"layer compression {compression} is not supported.")
-        fmt = "<%dL" % (len(data) // 4)
-        return list(struct.unpack(fmt, data))
+        gids = array("I")
+        gids.frombytes(data[: len(data) // 4 * 4])
+        if sys.byteorder != "little":
+            gids.byteswap()
+        return gids
     elif encoding == "csv":
-        return [int(i) for i in text.split(",")]
+        return array("I", map(int, text.split(",")))
     elif encoding:
         raise ValueError(f"layer encoding {encoding} is not supported.")
 
 
+def flags_to_bits(flags: Optional[TileFlags]) -> int:
+    """Pack TileFlags into the internal TRANS_* bits.
+
+    Args:
+        flags (Optional[TileFlags]): Flags to pack, may be falsy.
+
+    Returns:
+        int: Index into `flag_combinations`.
+
+    """
+    if not flags:
+        return 0
+    return (
+        (TRANS_FLIPX if flags[0] else 0)
+        | (TRANS_FLIPY if flags[1] else 0)
+        | (TRANS_ROT if flags[2] else 0)
+    )
+
+
+def open_compiled(filename: str) -> memoryview:
+    """Return the contents of a compiled map, memory mapped if possible.
+
+    The mapping is copy-on-write, so layer data can still be edited in
+    memory without touching the file.
+
+    Args:
+        filename (str): Compiled map to open.
+
+    Returns:
+        memoryview: The raw bytes of the file.
+
+    """
+    with open(filename, "rb") as file:
+        if mmap is not None:
+            try:
+                return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY))
+            except (OSError, ValueError):
+                # empty files and some filesystems can't be mapped
+                file.seek(0)
+        return memoryview(bytearray(file.read()))
+
+
+def parse_compiled_header(buffer: memoryview) -> Tuple[dict, int]:
+    """Return the JSON table of a compiled map and where its layer data starts.
+
+    Args:
+        buffer (memoryview): Raw bytes of a compiled map.
+
+    Raises:
+        ValueError: if the buffer is not a compiled map of this version.
+
+    Returns:
+        Tuple[dict, int]: The table and the byte offset of the layer data.
+
+    """
+    if len(buffer) < compiled_header.size:
+        raise ValueError("compiled map is truncated")
+    magic, version, size = compiled_header.unpack_from(buffer)
+    if magic != COMPILED_MAGIC or version != COMPILED_VERSION:
+        raise ValueError("not a compiled map, or compiled by another version")
+
+    start = compiled_header.size
+    table = json.loads(bytes(buffer[start : start + size]))
+    # layer data is aligned to 4 bytes so it can be cast to uint32 in place
+    return table, (start + size + 3) & ~3
+
+
+def read_compiled_metadata(filename: str) -> Optional[dict]:
+    """Return the metadata stored with `TiledMap.dump_compiled`.
+
+    Only the header is read, so this is cheap enough to check whether a
+    compiled map is stale before loading it.
+
+    Args:
+        filename (str): Compiled map to read.
+
+    Raises:
+        ValueError: if the file is not a compiled map of this version.
+
+    Returns:
+        Optional[dict]: The metadata, or None if none was stored.
+
+    """
+    with open(filename, "rb") as file:
+        header = file.read(compiled_header.size)
+        if len(header) < compiled_header.size:
+            raise ValueError("compiled map is truncated")
+        size = compiled_header.unpack(header)[2]
+        buffer = memoryview(header + file.read(size))
+    return parse_compiled_header(buffer)[0]["metadata"]
+
+
+def get_plain_attributes(element: TiledElement, exclude: Sequence[str] = ()) -> Dict:
+    """Return the attributes of an element that can be written as JSON as is.
+
+    Args:
+        element (TiledElement): Element to read.
+        exclude (Sequence[str]): Attribute names to leave out.
+
+    Returns:
+        Dict: Attribute names and their str, int, float, bool or None values.
+
+    """
+    return {
+        key: value
+        for key, value in vars(element).items()
+        if key not in exclude
+        and (value is None or isinstance(value, (str, int, float, bool)))
+    }
+
+
 def convert_to_bool(value: str) -> bool:
     """Convert a few common variations of "true" and "false" to boolean
 
@@ -438,6 +568,9 @@ class TiledElement:
         self.properties = properties
 
     def __getattr__(self, item):
+        if item == "properties":
+            # not set yet, e.g. while unpickling
+            raise AttributeError(item)
         try:
             return self.properties[item]
         except KeyError:
@@ -490,6 +623,8 @@ class TiledMap(TiledElement):
             invert_y (bool): Invert the y axis.
             load_all_tiles (bool): Load all tile images, even if never used.
             allow_duplicate_names (bool): Allow duplicates in objects' metadata.
+            compact_layers (bool): Store tile layers as flat uint32 arrays
+                (see `TileLayerData`) instead of nested lists.
 
         """
         TiledElement.__init__(self)
@@ -501,6 +636,7 @@ class TiledMap(TiledElement):
         self.optional_gids = kwargs.get("optional_gids", set())
         self.load_all_tiles = kwargs.get("load_all", True)
         self.invert_y = kwargs.get("invert_y", True)
+        self.compact_layers = kwargs.get("compact_layers", False)
 
         # allow duplicate names to be parsed and loaded
         TiledElement.allow_duplicate_names = kwargs.get("allow_duplicate_names", False)
@@ -519,6 +655,8 @@ class TiledMap(TiledElement):
         self.imagemap = dict()  # mapping of gid and trans flags to real gids
         self.tiledgidmap = dict()  # mapping of tiledgid to pytmx gid
         self.maxgid = 1
+        # raw gids from the tmx data, flags included, to pytmx gids
+        self.gid_table = GidTable(self.register_gid_check_flags)
 
         # should be filled in by a loader function
         self.images = list()
@@ -633,6 +771,196 @@ class TiledMap(TiledElement):
         self.reload_images()
         return self
 
+    @classmethod
+    def from_compiled(
+        cls,
+        filename: str,
+        image_loader=default_image_loader,
+        **kwargs,
+    ) -> TiledMap:
+        """Load a map written by `TiledMap.dump_compiled`.
+
+        No XML is parsed and the layer data is used straight from the
+        (memory mapped) file, so this is much faster than loading the .tmx.
+
+        Args:
+            filename (str): Compiled map to load.
+            image_loader (???): Function that will load images.
+            **kwargs: Same keyword arguments as `TiledMap`.
+
+        Raises:
+            ValueError: if the file is not a compiled map of this version.
+
+        Returns:
+            TiledMap: The loaded map.
+
+        """
+        tiled_map = cls(image_loader=image_loader, **kwargs)
+        return tiled_map.parse_compiled(open_compiled(filename), filename)
+
+    def parse_compiled(self, buffer: memoryview, filename: str) -> TiledMap:
+        """Parse a map from the bytes of a compiled map.
+
+        Args:
+            buffer (memoryview): Raw bytes of the compiled map.
+            filename (str): Where the compiled map was read from, used to
+                find the .tmx it was made from.
+
+        Returns:
+            TiledMap: The parsed map.
+
+        """
+        table, data_offset = parse_compiled_header(buffer)
+        dirname = os.path.dirname(filename)
+        self.filename = os.path.normpath(os.path.join(dirname, table["source"]))
+        for key, value in table["map"].items():
+            setattr(self, key, value)
+        self.properties = table["properties"]
+
+        # restore the gid mapping exactly as it was made by the parser
+        for gid, (tiled_gid, bits) in enumerate(table["gids"], 1):
+            flags = flag_combinations[bits]
+            self.imagemap[(tiled_gid, flags)] = (gid, flags)
+            self.gidmap[tiled_gid].append((gid, flags))
+            self.tiledgidmap[gid] = tiled_gid
+        self.maxgid = len(table["gids"]) + 1
+
+        tile_properties = table["tile_properties"]
+        for properties in tile_properties:
+            if "frames" in properties:
+                properties["frames"] = [
+                    AnimationFrame(*frame) for frame in properties["frames"]
+                ]
+        for gid, index in table["tile_property_index"]:
+            self.set_tile_properties(gid, tile_properties[index])
+
+        for attributes in table["tilesets"]:
+            tileset = TiledTileset(self)
+            for key, value in attributes.items():
+                setattr(tileset, key, value)
+            tileset.offset = tuple(tileset.offset)
+            self.add_tileset(tileset)
+
+        for attributes in table["layers"]:
+            layer = TiledTileLayer(self)
+            start = data_offset + attributes.pop("offset")
+            gids = buffer[start : start + attributes.pop("count") * 4]
+            for key, value in attributes.items():
+                setattr(layer, key, value)
+
+            if sys.byteorder == "little":
+                gids = gids.cast("I")
+            else:
+                gids = array("I", gids)
+                gids.byteswap()
+            layer.data = TileLayerData(gids, layer.width, layer.height)
+            self.add_layer(layer)
+
+        self.reload_images()
+        return self
+
+    def dump_compiled(self, filename: str, metadata: Optional[dict] = None) -> None:
+        """Write the map to `filename` in the compiled format.
+
+        The file holds a JSON table with the map, tileset, gid and tile
+        property data, followed by each tile layer as little-endian uint32
+        pytmx gids.  Images are not stored; `from_compiled` loads them from
+        the tilesets like the .tmx loader does.
+
+        Args:
+            filename (str): Where to write the compiled map.
+            metadata (Optional[dict]): JSON data stored with the map, see
+                `read_compiled_metadata`.
+
+        Raises:
+            ValueError: if the map uses something the format can't hold, such
+                as object groups, image or group layers, colliders or class
+                properties.
+
+        """
+        if self.filename is None:
+            raise ValueError("only maps loaded from a file can be compiled")
+        if self.custom_types or not all(
+            isinstance(layer, TiledTileLayer) for layer in self.layers
+        ):
+            raise ValueError("only maps made of tile layers can be compiled")
+
+        layers = list()
+        chunks = list()
+        size = 0
+        for layer in self.layers:
+            if isinstance(layer.data, TileLayerData):
+                gids = array("I", layer.data.gids)
+            else:
+                gids = array("I", chain.from_iterable(layer.data))
+            if sys.byteorder != "little":
+                gids.byteswap()
+            attributes = get_plain_attributes(layer)
+            attributes.update(properties=layer.properties, offset=size, count=len(gids))
+            layers.append(attributes)
+            chunks.append(gids.tobytes())
+            size += len(chunks[-1])
+
+        tilesets = list()
+        for tileset in self.tilesets:
+            attributes = get_plain_attributes(tileset)
+            attributes.update(properties=tileset.properties, offset=tileset.offset)
+            tilesets.append(attributes)
+
+        # (0, 0) maps straight to gid 0, everything else to (gid, flags)
+        gids = sorted(
+            (value[0], key[0], flags_to_bits(value[1]))
+            for key, value in self.imagemap.items()
+            if key != (0, 0)
+        )
+        if [gid for gid, _, _ in gids] != list(range(1, self.maxgid)):
+            raise ValueError("map has gids that were not registered from tiles")
+
+        # tiles with flags share one properties dict, keep it that way
+        tile_properties = list()
+        tile_property_index = list()
+        indexes = dict()
+        for gid, properties in self.tile_properties.items():
+            index = indexes.setdefault(id(properties), len(tile_properties))
+            if index == len(tile_properties):
+                tile_properties.append(properties)
+            tile_property_index.append((gid, index))
+
+        source = os.path.relpath(
+            os.path.abspath(self.filename), os.path.dirname(os.path.abspath(filename))
+        )
+        exclude = (
+            "filename",
+            "custom_property_filename",
+            "load_all_tiles",
+            "invert_y",
+            "compact_layers",
+            "maxgid",
+        )
+        table = {
+            "source": source,
+            "metadata": metadata,
+            "map": get_plain_attributes(self, exclude),
+            "properties": self.properties,
+            "tilesets": tilesets,
+            "gids": [(tiled_gid, bits) for _, tiled_gid, bits in gids],
+            "tile_properties": tile_properties,
+            "tile_property_index": tile_property_index,
+            "layers": layers,
+        }
+        try:
+            encoded = json.dumps(table, separators=(",", ":")).encode("utf-8")
+        except TypeError as error:
+            raise ValueError(f"map cannot be compiled: {error}") from error
+
+        with open(filename, "wb") as file:
+            file.write(
+                compiled_header.pack(COMPILED_MAGIC, COMPILED_VERSION, len(encoded))
+            )
+            file.write(encoded)
+            file.write(bytes(-(compiled_header.size + len(encoded)) % 4))
+            file.writelines(chunks)
+
     def reload_images(self) -> None:
         """Load or reload the map images from disk.
 
@@ -1177,12 +1505,13 @@ class TiledTileset(TiledElement):
 
     """
 
-    def __init__(self, parent, node) -> None:
+    def __init__(self, parent, node: Optional[ElementTree.Element] = None) -> None:
         """Represents a Tiled Tileset
 
         Args:
             parent (???): ???.
-            node (ElementTree.Element): ???.
+            node (Optional[ElementTree.Element]): ???, if None the tileset is
+                left empty to be filled in by the caller.
 
         """
         TiledElement.__init__(self)
@@ -1205,7 +1534,8 @@ class TiledTileset(TiledElement):
         self.width = 0
         self.height = 0
 
-        self.parse_xml(node)
+        if node is not None:
+            self.parse_xml(node)
 
     def parse_xml(self, node: ElementTree.Element) -> "TiledTileset":
         """Parse a Tileset from ElementTree xml element.
@@ -1349,14 +1679,68 @@ class TiledGroupLayer(TiledElement):
         return self
 
 
+class GidTable(dict):
+    """Mapping of the GIDs found in TMX data, flags included, to pytmx GIDs.
+
+    A map keeps one for all its layers.  A GID is decoded and registered the
+    first time it's looked up, so GIDs are registered in the order they first
+    appear, the same as calling `register_gid_check_flags` on every tile.
+
+    """
+
+    def __init__(self, register: Callable[[int], int]):
+        super().__init__()
+        self.register = register
+
+    def __missing__(self, tiled_gid: int) -> int:
+        gid = self[tiled_gid] = self.register(tiled_gid)
+        return gid
+
+
+class TileLayerData:
+    """Rows of gids over one flat buffer, indexed like nested lists: data[y][x].
+
+    Rows are memoryview slices of the buffer, so nothing is copied and no
+    int objects are made until a tile is read.  A layer takes 4 bytes per
+    tile this way, instead of a list slot and (often) an int per tile.
+
+    """
+
+    def __init__(self, gids: Union[array, memoryview], width: int, height: int):
+        self.gids = gids
+        self.width = width
+        self.height = height
+        self._view = memoryview(gids)
+
+    def __len__(self) -> int:
+        return self.height
+
+    def __getitem__(self, y):
+        if isinstance(y, slice):
+            return [self[i] for i in range(*y.indices(self.height))]
+        if y < 0:
+            y += self.height
+        if not 0 <= y < self.height:
+            raise IndexError("layer row out of range")
+        start = y * self.width
+        return self._view[start : start + self.width]
+
+    def __iter__(self):
+        for y in range(self.height):
+            yield self[y]
+
+
 class TiledTileLayer(TiledElement):
     """Represents a TileLayer.
 
     To just get the tile images, use TiledTileLayer.tiles().
 
+    `data` is a list of rows, or a `TileLayerData` when the map was loaded
+    with `compact_layers` or from a compiled map.  Both index as data[y][x].
+
     """
 
-    def __init__(self, parent, node) -> None:
+    def __init__(self, parent, node: Optional[ElementTree.Element] = None) -> None:
         TiledElement.__init__(self)
         self.parent = parent
         self.data = list()
@@ -1370,7 +1754,8 @@ class TiledTileLayer(TiledElement):
         self.offsetx = 0
         self.offsety = 0
 
-        self.parse_xml(node)
+        if node is not None:
+            self.parse_xml(node)
 
     def __iter__(self):
         return self.iter_data()
@@ -1394,8 +1779,10 @@ class TiledTileLayer(TiledElement):
 
         """
         images = self.parent.images
-        for x, y, gid in [i for i in self.iter_data() if i[2]]:
-            yield x, y, images[gid]
+        for y, row in enumerate(self.data):
+            for x, gid in enumerate(row):
+                if gid:
+                    yield x, y, images[gid]
 
     def _set_properties(self, node) -> None:
         TiledElement._set_properties(self, node)
@@ -1430,16 +1817,19 @@ class TiledTileLayer(TiledElement):
                 "XML tile elements are no longer supported. Must use base64 or csv map formats."
             )
 
-        temp = [
-            self.parent.register_gid_check_flags(gid)
-            for gid in unpack_gids(
-                text=data_node.text.strip(),
-                encoding=data_node.get("encoding", None),
-                compression=data_node.get("compression", None),
-            )
-        ]
+        tiled_gids = unpack_gids(
+            text=data_node.text.strip(),
+            encoding=data_node.get("encoding", None),
+            compression=data_node.get("compression", None),
+        )
+        # one pass over the layer; a gid's flags are only decoded the first
+        # time the map meets it
+        gids = array("I", map(self.parent.gid_table.__getitem__, tiled_gids))
 
-        self.data = reshape_data(temp, self.width)
+        if self.parent.compact_layers:
+            self.data = TileLayerData(gids, self.width, self.height)
+        else:
+            self.data = reshape_data(gids.tolist(), self.width)
         return self
 
 
@@ -19,7 +19,8 @@ License along with pytmx.  If not, see <http://www.gnu.org/licenses/>.
 """
 import itertools
 import logging
-from typing import List, Optional, Union
+import os
+from typing import Dict, List, Optional, Tuple, Union
 
 import pytmx
 from pytmx.pytmx import ColorLike, PointLike
@@ -33,7 +34,24 @@ except ImportError:
     logger.error("cannot import pygame (is it installed?)")
     raise
 
-__all__ = ["load_pygame", "pygame_image_loader", "simplify", "build_rects"]
+__all__ = [
+    "load_pygame",
+    "pygame_image_loader",
+    "clear_image_cache",
+    "simplify",
+    "build_rects",
+]
+
+# tileset images and converted tiles shared by every map loaded in this process.
+# tiles are keyed by (path, colorkey, pixelalpha, rect, flags)
+_tileset_images: Dict[str, pygame.Surface] = {}
+_tiles: Dict[Tuple, pygame.Surface] = {}
+
+
+def clear_image_cache() -> None:
+    """Forget every cached tileset image and tile, e.g. after editing a tileset."""
+    _tileset_images.clear()
+    _tiles.clear()
 
 
 def handle_transformation(
@@ -116,6 +134,9 @@ def pygame_image_loader(filename: str, colorkey: Optional[ColorLike], **kwargs):
     """
     pytmx image loader for pygame
 
+    Tiles are cached for the whole process, so every map using the same
+    tileset gets the same surfaces. Copy a tile before drawing onto it.
+
     Parameters:
         filename: filename, including path, to load
         colorkey: colorkey for the image
@@ -126,11 +147,23 @@ def pygame_image_loader(filename: str, colorkey: Optional[ColorLike], **kwargs):
     """
     if colorkey:
         colorkey = pygame.Color("#{0}".format(colorkey))
+    colorkey_key = tuple(colorkey) if colorkey else None
 
     pixelalpha = kwargs.get("pixelalpha", True)
-    image = pygame.image.load(filename)
+    path = os.path.abspath(filename)
 
     def load_image(rect=None, flags=None):
+        key = (path, colorkey_key, pixelalpha, tuple(rect) if rect else None, flags)
+        try:
+            return _tiles[key]
+        except KeyError:
+            pass
+
+        try:
+            image = _tileset_images[path]
+        except KeyError:
+            image = _tileset_images[path] = pygame.image.load(filename)
+
         if rect:
             try:
                 tile = image.subsurface(rect)
@@ -144,6 +177,7 @@ def pygame_image_loader(filename: str, colorkey: Optional[ColorLike], **kwargs):
             tile = handle_transformation(tile, flags)
 
         tile = smart_convert(tile, colorkey, pixelalpha)
+        _tiles[key] = tile
         return tile
 
     return load_image
@@ -1,10 +1,14 @@
-from itertools import cycle
+from __future__ import annotations
+
+import typing as t
 from pathlib import Path
 from typing import Sequence
 
 import pygame
 
-from .common import Time
+from . import shared
+
+C = t.TypeVar("C")
 
 
 def get_frames(
@@ -31,22 +35,58 @@ def get_frames(
     return frames
 
 
-class Animation:
+class Clip:
+    """Frames shown `frame_time` seconds each. Clips are shared, so they're
+    never changed once made."""
+
     def __init__(
-        self,
-        frames: Sequence[pygame.Surface],
-        animation_cooldown: float,
-        is_cycle: bool = True,
+        self, frames: Sequence[pygame.Surface], frame_time: float, loop: bool = True
     ) -> None:
-        self.indexable_frames = tuple(frames)
-        if is_cycle:
-            self.frames = cycle(frames)
-        else:
-            self.frames = iter(frames)
-        self.animation_cooldown = animation_cooldown
-        self.timer = Time(self.animation_cooldown)
-        self.current_frame = next(self.frames)
+        self.frames = tuple(frames)
+        self.frame_time = frame_time
+        self.loop = loop
+        self.duration = len(self.frames) * frame_time
+
+    def get_frame(self, time: float) -> pygame.Surface:
+        """Returns the frame `time` seconds in."""
+        index = int(time / self.frame_time)
+        if self.loop:
+            return self.frames[index % len(self.frames)]
+        return self.frames[min(index, len(self.frames) - 1)]
+
+
+class ClipRegistry:
+    """Clips by name, each built once and shared by everything playing them."""
+
+    __instance = None
+    __clips: dict[str, t.Any] = {}
+
+    def __new__(cls) -> ClipRegistry:
+        if cls.__instance is None:
+            cls.__instance = object.__new__(cls)
+        return cls.__instance
+
+    def get(self, name: str, build: t.Callable[[], C]) -> C:
+        """Returns the clips called `name`, from `build` the first time."""
+        if name not in self.__clips:
+            self.__clips[name] = build()
+        return self.__clips[name]
+
+
+class Animation:
+    """How far into a `Clip` something is, advanced by the simulation's dt."""
+
+    def __init__(self, clip: Clip) -> None:
+        self.clip = clip
+        self.time = 0.0
+
+    @property
+    def current_frame(self) -> pygame.Surface:
+        return self.clip.get_frame(self.time)
 
     def update(self) -> None:
-        if self.timer.tick():
-            self.current_frame = next(self.frames)
+        """Advances by a step, raising StopIteration once a clip that doesn't
+        loop has finished."""
+        if not self.clip.loop and self.time >= self.clip.duration:
+            raise StopIteration
+        self.time += shared.dt
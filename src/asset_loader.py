@@ -2,13 +2,16 @@ from __future__ import annotations
 
 import pygame
 
+from ._types import ColorValue
 from .common import get_path
+from .text import GlyphAtlas
 
 
 class Loader:
     __instance = None
     __fonts: dict[tuple[str, int], pygame.Font] = {}
     __sounds: dict[str, pygame.mixer.Sound] = {}
+    __glyph_atlases: dict[tuple[str, int, tuple[int, ...]], GlyphAtlas] = {}
 
     def __new__(cls) -> Loader:
         if cls.__instance is None:
@@ -34,3 +37,13 @@ class Loader:
     def remove_font(self, filename: str, font_size: int = 20) -> None:
         if (filename, font_size) in self.__fonts:
             del self.__fonts[filename, font_size]
+
+    def get_glyph_atlas(
+        self, filename: str, font_size: int = 20, color: ColorValue = "white"
+    ) -> GlyphAtlas:
+        key = filename, font_size, tuple(pygame.Color(color))
+        if key not in self.__glyph_atlases:
+            self.__glyph_atlases[key] = GlyphAtlas(
+                self.get_font(filename, font_size), color
+            )
+        return self.__glyph_atlases[key]
@@ -3,12 +3,20 @@ import pygame
 from . import shared
 from ._types import ColorValue
 from .common import SinWave, get_path, scale_add
-from .gameobject import get_relative_pos
+from .gameobject import get_relative_pos, is_on_screen
 
 
 class Bloom:
     IMAGE = pygame.image.load(get_path("assets/art/light.png")).convert_alpha()
     OVERLOADED_ROOMS = (2, 5, 6)
+    # odd, so the middle frame is the unscaled light
+    PULSE_STEPS = 17
+    # pulse frames shared by every bloom with the same (size, layers,
+    # expansion_factor) and lighting scale, filled in as the pulse reaches them.
+    # Each is drawn at the lighting resolution, paired with the size it covers
+    # on screen
+    PULSES: dict[tuple, list[tuple[pygame.Surface, tuple[int, int]] | None]] = {}
+    BASES: dict[tuple, pygame.Surface] = {}
 
     def __init__(
         self,
@@ -18,18 +26,26 @@ class Bloom:
         layers: list[ColorValue] | None = None,
     ) -> None:
         self.size = size
-        self.original_surf = pygame.transform.scale(Bloom.IMAGE, size)
-        self.surf = self.original_surf.copy()
-        self.rect = self.surf.get_rect()
         self.wave = SinWave(wave_speed)
         self.expansion_factor = expansion_factor
         self.layers = layers
 
-        self.draw_surf()
+        base_key = size, None if layers is None else tuple(layers)
+        if base_key not in Bloom.BASES:
+            Bloom.BASES[base_key] = self.draw_surf(
+                pygame.transform.scale(Bloom.IMAGE, size)
+            )
+        self.original_surf = Bloom.BASES[base_key]
+        self.frames = Bloom.PULSES.setdefault(
+            (*base_key, expansion_factor, shared.LIGHTING_SCALE),
+            [None] * Bloom.PULSE_STEPS,
+        )
+        self.surf, size = self.get_frame(0)
+        self.rect = pygame.Rect((0, 0), size)
 
-    def draw_surf(self):
+    def draw_surf(self, surf: pygame.Surface) -> pygame.Surface:
         if self.layers is None:
-            return
+            return surf
 
         width_delta = self.size[0] / len(self.layers)
         height_delta = self.size[0] / len(self.layers)
@@ -45,25 +61,52 @@ class Bloom:
             layer_bases.append(layer_base)
 
         for layer_base in reversed(layer_bases):
-            self.original_surf.blit(
+            surf.blit(
                 layer_base,
-                layer_base.get_rect(center=self.original_surf.get_rect().center),
+                layer_base.get_rect(center=surf.get_rect().center),
                 # special_flags=pygame.BLEND_RGBA_ADD,
             )
+        return surf
+
+    def get_frame(self, val: float) -> tuple[pygame.Surface, tuple[int, int]]:
+        """Returns the pulse frame closest to the wave value `val`."""
+        last = Bloom.PULSE_STEPS - 1
+        index = round((val + 1) / 2 * last)
+        frame = self.frames[index]
+        if frame is None:
+            term = (index / last * 2 - 1) * self.expansion_factor
+            scale = shared.LIGHTING_SCALE
+            if scale == 1:
+                surf = scale_add(self.original_surf, term)
+                size = surf.get_size()
+            else:
+                # truncated the same way scale_add would
+                size = pygame.Rect(
+                    (0, 0), (self.size[0] + term, self.size[1] + term)
+                ).size
+                surf = pygame.transform.smoothscale(
+                    self.original_surf,
+                    (max(size[0] // scale, 1), max(size[1] // scale, 1)),
+                )
+            frame = self.frames[index] = surf, size
+        return frame
 
     def update(self, pos):
         # if shared.IS_WASM and shared.room_id in (Bloom.OVERLOADED_ROOMS):
         #     self.rect.center = pos
         #     return
         self.wave.update(shared.dt)
-        self.surf = scale_add(self.original_surf, self.wave.val * self.expansion_factor)
-        self.rect = self.surf.get_rect()
+        self.surf, size = self.get_frame(self.wave.val)
+        self.rect = pygame.Rect((0, 0), size)
         self.rect.center = pos
 
     def draw(self):
+        if not is_on_screen(self.rect):
+            return
+
         flags = pygame.BLEND_RGBA_MAX
         # if shared.IS_WASM:
         #     flags = 0
-        shared.overlay.blit(
-            self.surf, get_relative_pos(self.rect.topleft), special_flags=flags
-        )
+        x, y = get_relative_pos(self.rect.topleft)
+        scale = shared.LIGHTING_SCALE
+        shared.overlay.blit(self.surf, (x / scale, y / scale), special_flags=flags)
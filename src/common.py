@@ -42,21 +42,24 @@ def render_at(
 class Time:
     """Class to check if a certain amount of time has passed."""
 
+    # replaced by a simulated clock when running headless
+    clock: t.Callable[[], float] = time.perf_counter
+
     def __init__(self, time_to_pass: float):
         self.time_to_pass = time_to_pass
-        self.start = time.perf_counter()
+        self.start = Time.clock()
 
     def reset(self) -> None:
-        self.start = time.perf_counter()
+        self.start = Time.clock()
 
     def tick(self) -> bool:
-        if time.perf_counter() - self.start > self.time_to_pass:
-            self.start = time.perf_counter()
+        if Time.clock() - self.start > self.time_to_pass:
+            self.start = Time.clock()
             return True
         return False
 
     def get_time_left(self) -> float:
-        return self.time_to_pass - (time.perf_counter() - self.start)
+        return self.time_to_pass - (Time.clock() - self.start)
 
 
 class SinWave:
@@ -1,25 +1,53 @@
 import asyncio
+import time
+import typing as t
 
 import pygame
 
 from . import shared
+from .common import Time
 from .enums import DoorDirection
 from .gamestate import GameStateManager
+from .interpolation import Interpolator
+from .profiler import Profiler
+from .renderer import Renderer
+
+
+def get_sim_time() -> float:
+    return shared.sim_time
 
 
 class Core:
+    # the simulation advances in steps this long, whatever the frame rate
+    STEP = 1 / shared.SIMULATION_RATE
+    # longer frames are cut short, slowing the game down rather than running
+    # more and more steps to catch up
+    MAX_FRAME_TIME = 0.1
+    # how often states that only draw on input check for it
+    POLL_INTERVAL = 1 / 60
+
     def __init__(self) -> None:
         self.win_init()
 
-        shared.dt = 0.0
+        shared.dt = Core.STEP
         shared.events = []
+        # simulation time not yet stepped through
+        self.accumulator = 0.0
+        # events waiting for the next step
+        self.pending_events: list[pygame.event.Event] = []
+        self.interpolator = Interpolator()
+        # timers follow the simulation rather than the wall clock
+        Time.clock = get_sim_time
 
         from .deathscreen import DeathScreen
         from .introstate import IntroState
         from .mainmenu import MainMenu
         from .playstate import PlayState
+        from .room_preloader import RoomPreloader
         from .victoryscreen import VictoryScreen
 
+        self.preloader = RoomPreloader()
+
         GameStateManager().add_state(PlayState)
         GameStateManager().add_state(IntroState)
         GameStateManager().add_state(MainMenu)
@@ -33,12 +61,11 @@ class Core:
         shared.room_id = 1
         shared.entities_in_room = {}
         shared.next_door = DoorDirection.SOUTH
-        shared.update_graph = True
         if hasattr(shared, "overlay"):
             del shared.player
-            del shared.monster
+            del shared.monsters
         GameStateManager().reset()
-        self.__init__()
+        Core.__init__(self)
         GameStateManager().set_state("PlayState")
 
     def win_init(self) -> None:
@@ -47,39 +74,105 @@ class Core:
         shared.clock = pygame.time.Clock()
         pygame.display.set_caption(shared.game_name)
 
+    def get_events(self) -> list[pygame.event.Event]:
+        return pygame.event.get()
+
+    def get_dt(self) -> float:
+        return shared.clock.tick() / 1000
+
+    def get_keys(self) -> t.Sequence[bool]:
+        return pygame.key.get_pressed()
+
+    def get_mouse_pos(self) -> tuple[int, int]:
+        return pygame.mouse.get_pos()
+
     def update(self) -> None:
         if shared.reset:
             self.reset()
             shared.reset = False
 
-        shared.events = pygame.event.get()
-        for event in shared.events:
+        events = self.get_events()
+        for event in events:
             if event.type == pygame.QUIT:
                 raise SystemExit
+        shared.events = events
+        Profiler().handle_events()
+        self.pending_events.extend(events)
 
-        GameStateManager().handle_events()
-        if shared.reset:
-            return
-
-        shared.dt = shared.clock.tick() / 1000
-        shared.dt = min(shared.dt, 0.1)
-
-        shared.keys = pygame.key.get_pressed()
-        shared.mouse_pos = pygame.mouse.get_pos()
+        self.accumulator += min(self.get_dt(), Core.MAX_FRAME_TIME)
+        shared.keys = self.get_keys()
+        shared.mouse_pos = self.get_mouse_pos()
 
         if not shared.IS_WASM:
             pygame.display.set_caption(
                 f"{shared.game_name} | {shared.clock.get_fps():.0f}"
             )
+
+        while self.accumulator >= Core.STEP:
+            if not self.advance():
+                return
+
+    def advance(self) -> bool:
+        """Advances the simulation by one step, returns False if it was reset."""
+        # only the first step of a frame sees its events
+        shared.events, self.pending_events = self.pending_events, []
+        GameStateManager().handle_events()
+        if shared.reset:
+            return False
+
+        state = GameStateManager().state
+        if state is not None:
+            self.interpolator.capture(state.get_interpolated())
+        shared.dt = Core.STEP
         GameStateManager().update()
+        shared.sim_time += Core.STEP
+        self.accumulator -= Core.STEP
+        return True
 
     def draw(self) -> None:
+        # what's left in the accumulator is how far into the next step we are
+        with self.interpolator.interpolate(self.accumulator / Core.STEP):
+            Renderer().draw(GameStateManager().state, self.draw_frame)
+
+    def draw_frame(self) -> None:
         shared.screen.fill("black")
         GameStateManager().draw()
-        pygame.display.flip()
+        Profiler().draw()
+
+    def get_frame_rate(self) -> float | None:
+        """Returns the active state's frame rate, within `FRAME_CAP`."""
+        state = GameStateManager().state
+        if state is None or shared.reset:
+            return 0
+        rate = state.get_frame_rate()
+        if rate is not None and shared.FRAME_CAP:
+            rate = min(rate or shared.FRAME_CAP, shared.FRAME_CAP)
+        return rate
+
+    async def wait(self, deadline: float) -> float:
+        """Sleeps until the active state's next frame is due, or until there's
+        input if it only needs drawing then. Returns when the frame was due."""
+        rate = self.get_frame_rate()
+        if rate is None:
+            # there's no awaitable pygame.event.wait, so poll for events
+            while not pygame.event.peek():
+                await asyncio.sleep(Core.POLL_INTERVAL)
+            return time.perf_counter()
+
+        now = time.perf_counter()
+        if rate:
+            deadline += 1 / rate
+        # frames that are running late don't hurry to catch up
+        deadline = max(deadline, now)
+        # time to spare goes to loading the rooms the player can go to next
+        self.preloader.run(deadline)
+        # also gives the browser its turn, even when not waiting at all
+        await asyncio.sleep(max(deadline - time.perf_counter(), 0))
+        return deadline
 
     async def run(self) -> None:
+        deadline = time.perf_counter()
         while True:
             self.update()
             self.draw()
-            await asyncio.sleep(0)
+            deadline = await self.wait(deadline)
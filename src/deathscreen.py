@@ -95,6 +95,11 @@ class DeathScreen(GameState):
     def update(self) -> None:
         ...
 
+    def get_frame_rate(self) -> float | None:
+        if self.animation_finished:
+            return None
+        return self.FRAME_RATE
+
     def draw(self) -> None:
         if self.frame_index < len(DeathScreen.frames):
             if self.frame_timer.tick():
@@ -4,19 +4,44 @@ import typing as t
 import pygame
 
 from . import shared
-from .anim import Animation, get_frames
+from .anim import Animation, Clip, ClipRegistry, get_frames
 from .bloom import Bloom
 from .common import get_path, render_at
 from .enums import DoorDirection, MovementType, StoneSymbol
-from .gameobject import GameObject, get_relative_pos
+from .gameobject import GameObject, get_relative_pos, is_on_screen
 from .gamestate import GameStateManager
 
+# fall clips by the image that falls, see get_fall_clip. The images are tiles,
+# which pytmx's tile cache keeps for as long as the game runs, and so are these
+FALL_CLIPS: dict[pygame.Surface, Clip] = {}
+
+
+def get_fall_clip(image: pygame.Surface) -> Clip:
+    """Returns `image` sinking a quarter of its height into a hole, made once
+    per image."""
+    if image not in FALL_CLIPS:
+        frames = [image.copy()]
+        for fall_distance in range(1, image.get_height() // 4 + 1):
+            frame = image.copy()
+            frame.scroll(0, fall_distance)
+            frame.fill((0, 0, 0, 0), (0, 0, image.get_width(), fall_distance))
+            frames.append(frame)
+        FALL_CLIPS[image] = Clip(frames, 0.2, False)
+    return FALL_CLIPS[image]
+
 
 class Entity(GameObject):
+    # whether the image stays the same while the entity can't move, which lets
+    # Grid bake it into the room's static layers
+    STATIC_IMAGE = True
+    # whether Grid draws it into the room's background, so it's never drawn
+    # on its own
+    IN_BACKGROUND = False
+
     def __init__(self, cell, movement_type, image) -> None:
         self.speed = shared.ENTITY_SPEED
         self.cell = pygame.Vector2(cell)
-        self.movement_type = movement_type
+        self._movement_type = movement_type
 
         self.pos = self.cell * shared.TILE_SIDE
         self.rect: pygame.Rect = image.get_rect(topleft=self.pos)
@@ -27,6 +52,25 @@ class Entity(GameObject):
         self.is_alive = True
         super().__init__(self.pos, is_visible=True, is_interactable=True, image=image)
 
+    @property
+    def movement_type(self) -> MovementType:
+        return self._movement_type
+
+    @movement_type.setter
+    def movement_type(self, new_movement_type: MovementType) -> None:
+        self._movement_type = new_movement_type
+        self.reindex()
+
+    def reindex(self) -> None:
+        if hasattr(shared, "spatial_hash"):
+            shared.spatial_hash.update(self)
+
+    def set_cell(self, new_cell) -> None:
+        if new_cell == self.cell:
+            return
+        self.cell = pygame.Vector2(new_cell)
+        self.reindex()
+
     @property
     def direction(self) -> tuple[int, int]:
         return self._direction
@@ -44,29 +88,18 @@ class Entity(GameObject):
     def get_surrounding_entities(self) -> t.Iterator[t.Self]:
         for row in (-1, 0, 1):
             for col in (-1, 0, 1):
-                entity_cell = self.cell + (row, col)
-                if (
-                    entity_cell.x > shared.room_map.width
-                    or entity_cell.y > shared.room_map.height
-                ):
-                    continue
-                try:
-                    yield shared.entities[shared.cells.index(entity_cell)]
-                except ValueError:
-                    continue
+                yield from shared.spatial_hash.get(self.cell + (row, col))
 
     def get_cell_diff(self, other_cell):
         return abs(self.cell[0] - other_cell[0]), abs(self.cell[1] - other_cell[1])
 
     def move(self) -> None:
-        if self.desired_pos != self.pos:
-            shared.update_graph = True
         self.pos.move_towards_ip(self.desired_pos, self.speed * shared.dt)
         self.rect.topleft = self.pos
 
     def transfer_cell(self) -> None:
         if self.pos == self.desired_pos:
-            self.cell = self.desired_cell.copy()
+            self.set_cell(self.desired_cell)
             self.moving = False
         else:
             self.moving = True
@@ -109,9 +142,15 @@ class MagicBlock(Entity):
             char = next(self.char_cycle)
         self.falling = False
         self.anims = None
+        # what the block falls as, it changes with the character
+        self.fall_image = image
+        # made while the room loads, rather than in the middle of a solve
+        get_fall_clip(image)
+        for block_image in MagicHole.BLOCK_IMAGES.values():
+            get_fall_clip(block_image)
 
     def check_placed(self):
-        for entity in shared.entities:
+        for entity in shared.spatial_hash.get(self.cell):
             if (
                 entity.cell == self.cell
                 and isinstance(entity, MagicHole)
@@ -125,13 +164,14 @@ class MagicBlock(Entity):
         if not self.moving:
             return
         if self.pos == self.desired_pos:
-            self.cell = self.desired_cell.copy()
+            self.set_cell(self.desired_cell)
             self.moving = False
 
             if self.check_placed():
                 return
             self.character = next(self.char_cycle)
-            self.image = MagicHole.BLOCK_IMAGES[self.character].copy()
+            self.fall_image = MagicHole.BLOCK_IMAGES[self.character]
+            self.image = self.fall_image.copy()
         else:
             self.moving = True
 
@@ -140,7 +180,7 @@ class MagicBlock(Entity):
             self.direction = (0, 0)
             return
 
-        for entity in shared.entities:
+        for entity in shared.spatial_hash.get_many(self.desired_cell, self.cell):
             if entity.cell == self.desired_cell:
                 if isinstance(entity, MagicHole) and self.character != entity.character:
                     self.direction = (0, 0)
@@ -172,7 +212,7 @@ class MagicBlock(Entity):
     def request_direction(self, new_direction) -> bool:
         desired_cell = self.cell + new_direction
 
-        for entity in shared.entities:
+        for entity in shared.spatial_hash.get(desired_cell):
             if entity.cell == desired_cell:
                 if isinstance(entity, MagicHole) and self.character != entity.character:
                     return False
@@ -195,11 +235,8 @@ class MagicBlock(Entity):
                 self.falling = False
                 self.movement_type = MovementType.STATIC
 
-                for entity in shared.entities:
-                    if (
-                        entity.rect.colliderect(self.rect)
-                        and entity.movement_type == MovementType.HOLE
-                    ):
+                for entity in shared.spatial_hash.query(self.cell, MovementType.HOLE):
+                    if entity.rect.colliderect(self.rect):
                         entity.movement_type = MovementType.WALKABLE
                         entity.filled = True
                         entity.is_partially_filled = False
@@ -210,22 +247,7 @@ class MagicBlock(Entity):
 
     def animate_fall(self) -> None:
         if self.anims is None:
-            cd = 0.2
-            frames: list[pygame.Surface] = [self.image.copy()]
-
-            fall_distance = 0
-            while fall_distance < self.image.get_height() // 4:
-                fall_distance += 1
-                self.image.scroll(0, 1)
-                pygame.draw.rect(
-                    self.image,
-                    (0, 0, 0, 0),
-                    pygame.Rect(0, 0, self.image.get_width(), fall_distance),
-                )
-                frames.append(self.image.copy())
-
-            self.anims = Animation(frames, cd, False)
-            self.image.scroll(0, -self.image.get_height() // 4)
+            self.anims = Animation(get_fall_clip(self.fall_image))
 
         self.anims.update()
         self.image = self.anims.current_frame
@@ -233,6 +255,9 @@ class MagicBlock(Entity):
 
 class Torch(Entity):
     FRAMES = get_frames(get_path("assets/art/torch.png"), (64, 64))
+    CLIP = Clip(FRAMES, 0.3)
+    # animates once lit
+    STATIC_IMAGE = False
 
     def __init__(
         self,
@@ -247,7 +272,7 @@ class Torch(Entity):
         self.near = False
         self.clicked = False
         self.original_image = self.image.copy()
-        self.anim = Animation(Torch.FRAMES, 0.3)
+        self.anim = Animation(Torch.CLIP)
         self.bloom = Bloom(
             (500, 500),
             0.6,
@@ -278,9 +303,9 @@ class Torch(Entity):
         if self.lit:
             self.anim.update()
             self.bloom.update(self.rect.center)
-            self.image = self.anim.current_frame.copy()
+            self.image = self.anim.current_frame
         else:
-            self.image = self.original_image.copy()
+            self.image = self.original_image
 
     def update(self):
         super().update()
@@ -296,6 +321,7 @@ class Torch(Entity):
 
 
 class Door(Entity):
+    IN_BACKGROUND = True
     DOOR_CONNECTION = {
         DoorDirection.SOUTH: DoorDirection.NORTH,
         DoorDirection.NORTH: DoorDirection.SOUTH,
@@ -337,6 +363,8 @@ class Door(Entity):
 
 
 class Wall(Entity):
+    IN_BACKGROUND = True
+
     def __init__(
         self,
         cell: tuple[int, int],
@@ -400,7 +428,8 @@ class Player(Entity):
         self.bloom = Bloom((500, 500), wave_speed=2, expansion_factor=35)
         self.img_rect = self.image.get_rect()
 
-    def init_anim(self) -> None:
+    @staticmethod
+    def load_clips() -> dict[tuple[int, int], Clip]:
         frames = get_frames(get_path("assets/art/player-128.png"), (64, 128))
 
         for index, frame in enumerate(frames):
@@ -417,12 +446,16 @@ class Player(Entity):
         ]
         north_frames = frames[8:12]
         anim_cd = 0.2
-        self.anims = {
-            (0, -1): Animation(north_frames, anim_cd),
-            (1, 0): Animation(east_frames, anim_cd),
-            (-1, 0): Animation(west_frames, anim_cd),
-            (0, 1): Animation(south_frames, anim_cd),
+        return {
+            (0, -1): Clip(north_frames, anim_cd),
+            (1, 0): Clip(east_frames, anim_cd),
+            (-1, 0): Clip(west_frames, anim_cd),
+            (0, 1): Clip(south_frames, anim_cd),
         }
+
+    def init_anim(self) -> None:
+        clips = ClipRegistry().get("player", Player.load_clips)
+        self.anims = {direction: Animation(clip) for direction, clip in clips.items()}
         self.last_direction = (0, 1)
 
     def scan_controls(self) -> None:
@@ -457,8 +490,7 @@ class Player(Entity):
         self.check_for_win(entity)
 
     def scan_surroundings(self) -> None:
-        entities = shared.entities
-        for entity in entities:
+        for entity in shared.spatial_hash.get(self.desired_cell):
             if entity.cell == self.cell:
                 continue
             if (
@@ -485,7 +517,7 @@ class Player(Entity):
 
     def update_anim(self) -> None:
         if not self.moving or self.direction == (0, 0):
-            self.image = self.anims[self.last_direction].indexable_frames[0]
+            self.image = self.anims[self.last_direction].clip.frames[0]
             return
         self.anims[self.direction].update()
         self.image = self.anims[self.direction].current_frame
@@ -499,7 +531,11 @@ class Player(Entity):
         self.update_anim()
 
     def draw(self) -> None:
-        if self.is_visible and self.image is not None:
+        if (
+            self.is_visible
+            and self.image is not None
+            and is_on_screen(self.image.get_rect(midleft=self.pos))
+        ):
             shared.screen.blit(
                 self.image, self.image.get_rect(midleft=get_relative_pos(self.pos))
             )
@@ -525,6 +561,8 @@ class Stone(Entity):
         super().__init__(cell, MovementType.PUSHED, image.copy())
         self.falling = False
         self.anims = None
+        # made while the room loads, rather than in the middle of a solve
+        self.fall_clip = get_fall_clip(image)
         self.symbol = Stone.SYMBOL_MAP.get(self.properties["symbol"])
 
     def scan_surroundings(self) -> None:
@@ -532,7 +570,7 @@ class Stone(Entity):
             self.direction = (0, 0)
             return
 
-        for entity in shared.entities:
+        for entity in shared.spatial_hash.get_many(self.desired_cell, self.cell):
             if entity.cell == self.desired_cell:
                 if (
                     entity.movement_type == MovementType.HOLE
@@ -576,7 +614,7 @@ class Stone(Entity):
     def request_direction(self, new_direction) -> bool:
         desired_cell = self.cell + new_direction
 
-        for entity in shared.entities:
+        for entity in shared.spatial_hash.get(desired_cell):
             if entity.cell == desired_cell:
                 if (
                     entity.movement_type == MovementType.HOLE
@@ -601,11 +639,8 @@ class Stone(Entity):
             except StopIteration:
                 self.falling = False
                 self.movement_type = MovementType.WALKABLE
-                for entity in shared.entities:
-                    if (
-                        entity.rect.colliderect(self.rect)
-                        and entity.movement_type == MovementType.HOLE
-                    ):
+                for entity in shared.spatial_hash.query(self.cell, MovementType.HOLE):
+                    if entity.rect.colliderect(self.rect):
                         entity.movement_type = MovementType.WALKABLE
                         entity.filled = True
                         entity.is_partially_filled = False
@@ -613,22 +648,7 @@ class Stone(Entity):
 
     def animate_fall(self) -> None:
         if self.anims is None:
-            cd = 0.2
-            frames: list[pygame.Surface] = [self.image.copy()]
-
-            fall_distance = 0
-            while fall_distance < self.image.get_height() // 4:
-                fall_distance += 1
-                self.image.scroll(0, 1)
-                pygame.draw.rect(
-                    self.image,
-                    (0, 0, 0, 0),
-                    pygame.Rect(0, 0, self.image.get_width(), fall_distance),
-                )
-                frames.append(self.image.copy())
-
-            self.anims = Animation(frames, cd, False)
-            self.image.scroll(0, -self.image.get_height() // 4)
+            self.anims = Animation(self.fall_clip)
 
         self.anims.update()
         self.image = self.anims.current_frame
@@ -1,22 +1,54 @@
+import math
+
 import pygame
 
 from . import shared
 
+# camera x, y and the origin and view rect worked out for them
+_camera: tuple[float, float, pygame.Vector2, pygame.Rect] | None = None
 
-def get_relative_pos(absolute_pos: pygame.Vector2) -> pygame.Vector2:
-    camera_origin = shared.camera_pos - pygame.Vector2(
-        shared.screen.get_width() / 2, shared.screen.get_height() / 2
-    )
 
-    return absolute_pos - camera_origin
+def _get_camera() -> tuple[float, float, pygame.Vector2, pygame.Rect]:
+    global _camera
 
+    x, y = shared.camera_pos
+    if _camera is None or _camera[0] != x or _camera[1] != y:
+        width, height = shared.screen.get_size()
+        origin = pygame.Vector2(x - width / 2, y - height / 2)
+        # blits truncate positions, so pad the view to be safe
+        view = pygame.Rect(
+            math.floor(origin.x) - 1, math.floor(origin.y) - 1, width + 2, height + 2
+        )
+        _camera = x, y, origin, view
+    return _camera
 
-def get_absolute_pos(relative_pos: pygame.Vector2) -> pygame.Vector2:
-    camera_origin = shared.camera_pos - pygame.Vector2(
-        shared.screen.get_width() / 2, shared.screen.get_height() / 2
-    )
 
-    return relative_pos + camera_origin
+def get_camera_origin() -> pygame.Vector2:
+    """Returns the top left of the screen in absolute space.
+
+    Cached until the camera moves, so don't modify it.
+    """
+    return _get_camera()[2]
+
+
+def get_camera_rect() -> pygame.Rect:
+    """Returns the part of the room on screen, in absolute space.
+
+    Cached until the camera moves, so don't modify it.
+    """
+    return _get_camera()[3]
+
+
+def is_on_screen(absolute_rect: pygame.Rect) -> bool:
+    return get_camera_rect().colliderect(absolute_rect)
+
+
+def get_relative_pos(absolute_pos: pygame.Vector2) -> pygame.Vector2:
+    return absolute_pos - get_camera_origin()
+
+
+def get_absolute_pos(relative_pos: pygame.Vector2) -> pygame.Vector2:
+    return relative_pos + get_camera_origin()
 
 
 class GameObject:
@@ -37,7 +69,11 @@ class GameObject:
         self.pos += offset
 
     def draw(self) -> None:
-        if self.is_visible and self.image is not None:
+        if (
+            self.is_visible
+            and self.image is not None
+            and is_on_screen(self.image.get_rect(topleft=self.pos))
+        ):
             shared.screen.blit(
                 self.image, self.image.get_rect(topleft=get_relative_pos(self.pos))
             )
@@ -1,9 +1,21 @@
 from __future__ import annotations
 
+import typing as t
 from abc import ABC, abstractmethod
 
+from .profiler import profiled
+
+if t.TYPE_CHECKING:
+    from .interpolation import Target
+
 
 class GameState(ABC):
+    # whether draw() can be recorded and partially replayed, see Renderer
+    DIRTY_RECTS = False
+    # frames drawn per second, 0 for as many as FRAME_CAP allows, None to
+    # only draw when there's input, see Core.wait
+    FRAME_RATE: float | None = 60
+
     def __init__(self, name: str) -> None:
         self.name = name
 
@@ -19,6 +31,16 @@ class GameState(ABC):
     def draw(self) -> None:
         pass
 
+    def get_interpolated(self) -> t.Iterable[Target]:
+        """Returns the positions to draw between simulation steps, see
+        `Interpolator`."""
+        return ()
+
+    def get_frame_rate(self) -> float | None:
+        """Returns how often the state needs drawing right now, states that
+        stop animating can go from `FRAME_RATE` to None."""
+        return self.FRAME_RATE
+
 
 class GameStateManager:
     __instance = None
@@ -45,10 +67,12 @@ class GameStateManager:
     def set_state(self, name: str) -> None:
         self.state = self.states[name]()
 
+    @profiled("GameStateManager.update")
     def update(self) -> None:
         if self.state is not None:
             self.state.update()
 
+    @profiled("GameStateManager.draw")
     def draw(self) -> None:
         if self.state is not None:
             self.state.draw()
@@ -3,43 +3,41 @@ import random
 import pygame
 
 from . import shared
+from ._types import Coordinate
 from .asset_loader import Loader
 from .common import Time, get_path
 
 
-def _get_subsurface(img: pygame.Surface, y):
-    wid = img.get_width()
-    height = random.randrange(10, 20)
-    shift = random.randint(10, 20)
-    shift *= random.choice((1, -1))
-    if y + height > img.get_height():
-        height = img.get_height() - y
-
-    sub = img.subsurface((0, y, wid, height))
-    sub_rect = sub.get_rect()
-    result = pygame.Surface(sub_rect.size)
-
-    result.blit(sub, (shift, 0))
-    if shift > 0:
-        sub_shift = sub.subsurface((0, 0, wid - shift, height))
-        result.blit(sub_shift, (0, 0))
-    else:
-        sub_shift = sub.subsurface(abs(shift), 0, wid - abs(shift), height)
-        result.blit(sub_shift, (wid - abs(shift), 0))
-    return result
-
-
-def _get_full_glitched(img: pygame.Surface):
+def _get_strips(height: int) -> list[tuple[int, int, int]]:
+    """Returns the (y, height, shift) of each strip of an image `height` tall
+    to move, picked at random."""
+    strips = []
     y_travelled = 0
-    result = img.copy()
-    while y_travelled < img.get_height():
+    while y_travelled < height:
         if random.random() > 0.8:
-            strip = _get_subsurface(img, y_travelled)
-            y_travelled += strip.get_height()
-            result.blit(strip, (0, y_travelled))
+            strip_height = random.randrange(10, 20)
+            shift = random.randint(10, 20)
+            shift *= random.choice((1, -1))
+            strip_height = min(strip_height, height - y_travelled)
+            strips.append((y_travelled, strip_height, shift))
+            y_travelled += strip_height
         else:
             y_travelled += random.randrange(10, 20)
-    return result
+    return strips
+
+
+def _glitch_into(img: pygame.Surface, result: pygame.Surface) -> None:
+    """Draws `img` into `result` with strips of it shifted sideways, wrapping
+    around. Each strip lands just below where it came from."""
+    wid = img.get_width()
+    blits: list[tuple[pygame.Surface, Coordinate, pygame.Rect]] = [
+        (img, (0, 0), img.get_rect())
+    ]
+    for y, height, shift in _get_strips(img.get_height()):
+        shift %= wid
+        blits.append((img, (shift, y + height), pygame.Rect(0, y, wid - shift, height)))
+        blits.append((img, (0, y + height), pygame.Rect(wid - shift, y, shift, height)))
+    result.blits(blits, doreturn=False)
 
 
 class Glitch:
@@ -72,6 +70,7 @@ class Glitch:
             return
         if self.timer.tick():
             self.static_sfx.play()
-            self.image = _get_full_glitched(shared.screen.copy())
+            # reuses the image instead of copying the screen into a new one
+            _glitch_into(shared.screen, self.image)
             self.dont_draw = False
         shared.screen.blit(self.image, (0, 0))
@@ -1,13 +1,315 @@
+from __future__ import annotations
+
+import typing as t
+from abc import ABC, abstractmethod
+from array import array
 from collections import defaultdict, deque
+from heapq import heappop, heappush
 
 from . import shared
 from ._types import Coordinate
 from .enums import MovementType
+from .profiler import profiled
+
+
+class SearchBuffers:
+    """Per-cell scratch arrays reused by every search on a graph.
+
+    Cells are indexed as `row * cols + col`. Instead of clearing the arrays
+    between searches, each search bumps `generation` and treats any cell whose
+    `seen` stamp is older as unvisited.
+    """
+
+    MAX_GENERATION = 0xFFFFFFFF
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.parents = array("i", [-1]) * size
+        self.costs = array("i", [0]) * size
+        self.seen = array("I", [0]) * size
+        self.generation = 0
+        # (estimated total, heuristic, cost, index); ties go to the node nearer the goal
+        self.open_nodes: list[tuple[int, int, int, int]] = []
+        self.queue: deque[int] = deque()
+
+    def begin(self) -> int:
+        if self.generation == SearchBuffers.MAX_GENERATION:
+            self.seen = array("I", [0]) * self.size
+            self.generation = 0
+        self.generation += 1
+        self.open_nodes.clear()
+        self.queue.clear()
+        return self.generation
+
+
+class SearchEngine(ABC):
+    """Finds a route between two cell indexes of a `Graph`.
+
+    `find` fills `graph.buffers.parents` so that following parents from `goal`
+    leads back to `start`. Consecutive parents always share a row or column but
+    need not be adjacent.
+    """
+
+    @abstractmethod
+    def find(self, graph: Graph, start: int, goal: int, passable: bytearray) -> bool:
+        pass
+
+
+class BreadthFirstSearch(SearchEngine):
+    def find(self, graph: Graph, start: int, goal: int, passable: bytearray) -> bool:
+        buffers = graph.buffers
+        generation = buffers.begin()
+        seen, parents, queue = buffers.seen, buffers.parents, buffers.queue
+        rows, cols = graph.rows, graph.cols
+
+        seen[start] = generation
+        parents[start] = -1
+        queue.append(start)
+        while queue:
+            node = queue.popleft()
+            if node == goal:
+                return True
+
+            row, col = divmod(node, cols)
+            for neighbor in graph.neighbor_indexes(row, col):
+                if seen[neighbor] != generation and (
+                    passable[neighbor] or neighbor == goal
+                ):
+                    seen[neighbor] = generation
+                    parents[neighbor] = node
+                    queue.append(neighbor)
+
+        return False
+
+
+class AStarSearch(SearchEngine):
+    """A* with a manhattan heuristic over the 4-connected grid."""
+
+    def find(self, graph: Graph, start: int, goal: int, passable: bytearray) -> bool:
+        buffers = graph.buffers
+        generation = buffers.begin()
+        seen, parents, costs = buffers.seen, buffers.parents, buffers.costs
+        open_nodes = buffers.open_nodes
+        cols = graph.cols
+        goal_row, goal_col = divmod(goal, cols)
+
+        seen[start] = generation
+        parents[start] = -1
+        costs[start] = 0
+        heappush(open_nodes, (0, 0, 0, start))
+        while open_nodes:
+            _, _, cost, node = heappop(open_nodes)
+            if node == goal:
+                return True
+            if cost > costs[node]:
+                # a cheaper route to this node was queued after this entry
+                continue
+
+            row, col = divmod(node, cols)
+            cost += 1
+            for neighbor in graph.neighbor_indexes(row, col):
+                if not passable[neighbor] and neighbor != goal:
+                    continue
+                if seen[neighbor] == generation and costs[neighbor] <= cost:
+                    continue
+                seen[neighbor] = generation
+                parents[neighbor] = node
+                costs[neighbor] = cost
+                n_row, n_col = divmod(neighbor, cols)
+                heuristic = abs(n_row - goal_row) + abs(n_col - goal_col)
+                heappush(open_nodes, (cost + heuristic, heuristic, cost, neighbor))
+
+        return False
+
+
+class JumpPointSearch(SearchEngine):
+    """Jump point search for grids without diagonal moves.
+
+    Straight runs of open cells are skipped in a single step, and only cells
+    where the route may have to turn end up on the open list.
+    """
+
+    def find(self, graph: Graph, start: int, goal: int, passable: bytearray) -> bool:
+        buffers = graph.buffers
+        generation = buffers.begin()
+        seen, parents, costs = buffers.seen, buffers.parents, buffers.costs
+        open_nodes = buffers.open_nodes
+        cols = graph.cols
+        goal_row, goal_col = divmod(goal, cols)
+
+        def is_open(row: int, col: int) -> bool:
+            if not (0 <= row < graph.rows and 0 <= col < cols):
+                return False
+            index = row * cols + col
+            return bool(passable[index]) or index == goal
+
+        def jump(row: int, col: int, d_row: int, d_col: int) -> int:
+            while True:
+                row += d_row
+                col += d_col
+                if not is_open(row, col):
+                    return -1
+                if row == goal_row and col == goal_col:
+                    return row * cols + col
+
+                if d_col:
+                    # forced neighbours: a side opens up that was shut behind us
+                    if (
+                        is_open(row - 1, col) and not is_open(row - 1, col - d_col)
+                    ) or (is_open(row + 1, col) and not is_open(row + 1, col - d_col)):
+                        return row * cols + col
+                else:
+                    if (
+                        is_open(row, col - 1) and not is_open(row - d_row, col - 1)
+                    ) or (is_open(row, col + 1) and not is_open(row - d_row, col + 1)):
+                        return row * cols + col
+                    # vertical runs stop wherever a horizontal run would find something
+                    if jump(row, col, 0, 1) != -1 or jump(row, col, 0, -1) != -1:
+                        return row * cols + col
+
+        seen[start] = generation
+        parents[start] = -1
+        costs[start] = 0
+        heappush(open_nodes, (0, 0, 0, start))
+        while open_nodes:
+            _, _, cost, node = heappop(open_nodes)
+            if node == goal:
+                return True
+            if cost > costs[node]:
+                continue
+
+            row, col = divmod(node, cols)
+            parent = parents[node]
+            if parent == -1:
+                directions = Graph.OFFSETS
+            else:
+                parent_row, parent_col = divmod(parent, cols)
+                d_row = (row > parent_row) - (row < parent_row)
+                d_col = (col > parent_col) - (col < parent_col)
+                if d_col:
+                    directions = ((-1, 0), (1, 0), (0, d_col))
+                else:
+                    directions = ((0, -1), (0, 1), (d_row, 0))
+
+            for d_row, d_col in directions:
+                jump_point = jump(row, col, d_row, d_col)
+                if jump_point == -1:
+                    continue
+                j_row, j_col = divmod(jump_point, cols)
+                new_cost = cost + abs(j_row - row) + abs(j_col - col)
+                if seen[jump_point] == generation and costs[jump_point] <= new_cost:
+                    continue
+                seen[jump_point] = generation
+                parents[jump_point] = node
+                costs[jump_point] = new_cost
+                heuristic = abs(j_row - goal_row) + abs(j_col - goal_col)
+                heappush(
+                    open_nodes,
+                    (new_cost + heuristic, heuristic, new_cost, jump_point),
+                )
+
+        return False
+
+
+class DistanceField:
+    """Breadth-first distances from the player's cell to every reachable cell.
+
+    Every monster in the room follows the same field by stepping to the
+    neighbouring cell closest to the player, so the field is only recomputed
+    when the player changes cell or the graph's walkability changes.
+    """
+
+    UNREACHABLE = -1
+
+    def __init__(self, graph: Graph) -> None:
+        self.graph = graph
+        size = graph.rows * graph.cols
+        self.distances = array("i", [DistanceField.UNREACHABLE]) * size
+        self._unreached = array("i", [DistanceField.UNREACHABLE]) * size
+        self._queue: deque[int] = deque()
+        self.root: Coordinate | None = None
+        self.graph_version = -1
+
+    def update(self, root: Coordinate) -> None:
+        if root == self.root and self.graph_version == self.graph.version:
+            return
+        self.root = root
+        self.graph_version = self.graph.version
+        self.recompute()
+
+    def recompute(self) -> None:
+        graph = self.graph
+        distances, passable, queue = self.distances, graph.passable, self._queue
+        distances[:] = self._unreached
+        queue.clear()
+
+        row, col = self.root
+        if not (0 <= row < graph.rows and 0 <= col < graph.cols):
+            return
+        start = row * graph.cols + col
+        distances[start] = 0
+        queue.append(start)
+        while queue:
+            node = queue.popleft()
+            distance = distances[node] + 1
+            for neighbor in graph.neighbor_indexes(*divmod(node, graph.cols)):
+                if passable[neighbor] and distances[neighbor] == -1:
+                    distances[neighbor] = distance
+                    queue.append(neighbor)
+
+    def get_distance(self, cell: Coordinate) -> int:
+        row, col = cell
+        if not (0 <= row < self.graph.rows and 0 <= col < self.graph.cols):
+            return DistanceField.UNREACHABLE
+        return self.distances[row * self.graph.cols + col]
+
+    def next_cell(self, cell: Coordinate) -> Coordinate | None:
+        """Returns the neighbour of `cell` one step closer to the player.
+
+        `cell` itself doesn't need to be walkable (monsters enter through
+        doors). Returns None at the player's cell or when the player can't be
+        reached from here.
+        """
+        best_distance = self.get_distance(cell)
+        if best_distance == 0:
+            return None
+
+        best = -1
+        for neighbor in self.graph.neighbor_indexes(*cell):
+            distance = self.distances[neighbor]
+            if distance == -1:
+                continue
+            if best_distance == -1 or distance < best_distance:
+                best, best_distance = neighbor, distance
+
+        if best == -1:
+            return None
+        return divmod(best, self.graph.cols)
 
 
 class Graph:
-    def __init__(self) -> None:
+    # cells holding any of these can't be walked through
+    BLOCKING_TYPES = (MovementType.HOLE, MovementType.PUSHED, MovementType.STATIC)
+    # (y, x)
+    OFFSETS = ((0, 1), (1, 0), (-1, 0), (0, -1))
+    # cells checked, or connected, per step of `build`
+    BUILD_CELLS = 128
+
+    def __init__(self, search_engine: SearchEngine | None = None) -> None:
         self._graph: dict[Coordinate, set[Coordinate]] = defaultdict(set)
+        self._walkable: set[Coordinate] = set()
+        self.search_engine = search_engine or AStarSearch()
+
+        self.rows, self.cols = shared.rows, shared.cols
+        size = self.rows * self.cols
+        self.buffers = SearchBuffers(size)
+        # passable[row * cols + col] mirrors `_walkable`
+        self.passable = bytearray(size)
+        # used when the player can't be reached, so the monster still closes in
+        self._open_grid = bytearray(b"\x01") * size
+        # bumped whenever a cell's walkability changes
+        self.version = 0
+        self.distance_field = DistanceField(self)
 
     def add_connection(self, first_end: Coordinate, second_end: Coordinate) -> None:
         self._graph[first_end].add(second_end)
@@ -35,16 +337,14 @@ class Graph:
         return second_end in self._graph[first_end]
 
     def remove_node(self, node: Coordinate) -> None:
-        for connected_node in self.get_connected_nodes(node):
+        for connected_node in tuple(self.get_connected_nodes(node)):
             self.remove_connection(node, connected_node)
         del self._graph[node]
 
     @staticmethod
     def get_neighbors(cell: Coordinate) -> list[Coordinate]:
         neighbors: list[Coordinate] = []
-        # (y, x)
-        offsets = [(0, 1), (1, 0), (-1, 0), (0, -1)]
-        for offset in offsets:
+        for offset in Graph.OFFSETS:
             test_coord = (cell[0] + offset[0], cell[1] + offset[1])
             if 0 <= test_coord[0] < shared.rows and 0 <= test_coord[1] < shared.cols:
                 neighbors.append(test_coord)
@@ -52,90 +352,117 @@ class Graph:
         return neighbors
 
     @staticmethod
-    def get_walkable_cells() -> set[Coordinate]:
-        cells: set[Coordinate] = set()
-
-        for entity in shared.entities:
-            cell = int(entity.cell.x), int(entity.cell.y)
-            if entity.movement_type in [
-                MovementType.HOLE,
-                MovementType.PUSHED,
-                MovementType.STATIC,
-            ]:
-                if cell in cells:
-                    cells.remove(cell)
-            else:
-                cells.add(cell)
+    def is_walkable(cell: Coordinate) -> bool:
+        row, col = cell
+        if not (0 <= row < shared.rows and 0 <= col < shared.cols):
+            return False
+        return not shared.spatial_hash.has((col, row), *Graph.BLOCKING_TYPES)
 
-        return cells
+    @staticmethod
+    def get_walkable_cells() -> set[Coordinate]:
+        return {
+            (row, col)
+            for row in range(shared.rows)
+            for col in range(shared.cols)
+            if Graph.is_walkable((row, col))
+        }
 
+    @profiled("Graph.create_graph")
     def create_graph(self) -> None:
-        walkable_cells = self.get_walkable_cells()
+        for _ in self.build():
+            pass
 
-        for cell in walkable_cells:
-            neighbors = self.get_neighbors(cell)
-            for neighbor in neighbors:
-                if neighbor in walkable_cells:
-                    self.add_connection(cell, neighbor)
-
-    # def search(self, source: Coordinate, dest: Coordinate) -> deque[Coordinate]:
-    #     output: deque[Coordinate] = deque()
+    def build(self) -> t.Iterator[None]:
+        """Does `create_graph`, yielding every `BUILD_CELLS` cells so that
+        `RoomPreloader` can spread it over frames."""
+        # everything recorded so far is covered by the full build
+        shared.spatial_hash.pop_changed_cells()
+        self._graph.clear()
+        self._walkable = set()
+        self.passable[:] = bytes(len(self.passable))
+        self.version += 1
 
-    #     explored: list[Coordinate] = [source]
-    #     parents: dict[Coordinate, Coordinate] = {}
-    #     nodes: deque[Coordinate] = deque()
-    #     nodes.append(source)
+        for index in range(self.rows * self.cols):
+            cell = divmod(index, self.cols)
+            if self.is_walkable(cell):
+                self._walkable.add(cell)
+                self.passable[index] = 1
+            if index % Graph.BUILD_CELLS == Graph.BUILD_CELLS - 1:
+                yield
 
-    #     while len(nodes) > 0:
-    #         node = nodes.popleft()
+        for index, cell in enumerate(self._walkable):
+            for neighbor in self.get_neighbors(cell):
+                if neighbor in self._walkable:
+                    self.add_connection(cell, neighbor)
+            if index % Graph.BUILD_CELLS == Graph.BUILD_CELLS - 1:
+                yield
 
-    #         if node == dest:
-    #             nodes.clear()
+    def update_cell(self, cell: Coordinate) -> None:
+        """Reconnects or cuts off a single cell after its occupants changed."""
+        walkable = self.is_walkable(cell)
+        if walkable == (cell in self._walkable):
+            return
 
-    #         for neighbor in self.get_neighbors(node):
-    #             if neighbor not in explored:
-    #                 explored.append(neighbor)
-    #                 parents[neighbor] = node
-    #                 nodes.append(neighbor)
+        self.passable[cell[0] * self.cols + cell[1]] = walkable
+        self.version += 1
+        if walkable:
+            self._walkable.add(cell)
+            for neighbor in self.get_neighbors(cell):
+                if neighbor in self._walkable:
+                    self.add_connection(cell, neighbor)
+        else:
+            self._walkable.remove(cell)
+            self.remove_node(cell)
 
-    #     current_node = dest
-    #     while current_node != source:
-    #         output.appendleft(current_node)
-    #         try:
-    #             # TODO: Find source of issues
-    #             current_node = parents[current_node]
-    #         except IndexError:
-    #             continue
-    #     output.appendleft(source)
+    def sync(self) -> None:
+        """Applies the cell changes `shared.spatial_hash` recorded since last time."""
+        for col, row in shared.spatial_hash.pop_changed_cells():
+            self.update_cell((row, col))
 
-    #     return output
+    def neighbor_indexes(self, row: int, col: int) -> list[int]:
+        neighbors: list[int] = []
+        for d_row, d_col in Graph.OFFSETS:
+            n_row, n_col = row + d_row, col + d_col
+            if 0 <= n_row < self.rows and 0 <= n_col < self.cols:
+                neighbors.append(n_row * self.cols + n_col)
+        return neighbors
 
+    @profiled("Graph.search")
     def search(self, source: Coordinate, dest: Coordinate) -> deque[Coordinate]:
-        output: deque[Coordinate] = deque()
+        """Returns the cells from `source` to `dest`, both included.
 
-        explored: set[Coordinate] = set()
-        parents: dict[Coordinate, Coordinate] = {}
-        nodes: deque[Coordinate] = deque([source])
+        Walls, holes and stones are routed around. If `dest` is sealed off the
+        route goes straight through them instead, like it did before the graph
+        was used for searching.
+        """
+        for row, col in (source, dest):
+            if not (0 <= row < self.rows and 0 <= col < self.cols):
+                return deque([source])
 
-        while nodes:
-            node = nodes.popleft()
+        start = source[0] * self.cols + source[1]
+        goal = dest[0] * self.cols + dest[1]
+        if not self.search_engine.find(self, start, goal, self.passable):
+            self.search_engine.find(self, start, goal, self._open_grid)
 
-            if node == dest:
-                break
+        return self.build_path(goal)
 
-            for neighbor in self.get_neighbors(node):
-                if neighbor not in explored:
-                    explored.add(neighbor)
-                    parents[neighbor] = node
-                    nodes.append(neighbor)
-
-        current_node = dest
-        while current_node != source:
-            output.appendleft(current_node)
-            try:
-                current_node = parents[current_node]
-            except KeyError:
-                continue
-        output.appendleft(source)
+    def build_path(self, goal: int) -> deque[Coordinate]:
+        output: deque[Coordinate] = deque()
+        parents = self.buffers.parents
+
+        row, col = divmod(goal, self.cols)
+        node = goal
+        while True:
+            output.appendleft((row, col))
+            node = parents[node]
+            if node == -1:
+                break
+            # parents can be several cells apart on the same row or column
+            p_row, p_col = divmod(node, self.cols)
+            while (row, col) != (p_row, p_col):
+                row += (p_row > row) - (p_row < row)
+                col += (p_col > col) - (p_col < col)
+                if (row, col) != (p_row, p_col):
+                    output.appendleft((row, col))
 
         return output
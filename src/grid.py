@@ -1,5 +1,11 @@
+from __future__ import annotations
+
+import typing as t
+
 import pygame
 
+import pytmx
+
 from . import shared
 from .entities import (
     Door,
@@ -14,8 +20,142 @@ from .entities import (
     Torch,
     Wall,
 )
-from .enums import MovementType
+from .enums import DoorDirection, MovementType
 from .gameobject import get_relative_pos
+from .graph import Graph
+from .profiler import profiled
+from .spatial_hash import SpatialHash
+
+
+class StaticLayer:
+    """A room sized surface with the entities of a draw list that can't move.
+
+    Entities are baked in while `is_static` holds for them and drawn one by one
+    otherwise. When an entity changes (see `SpatialHash.pop_changed_entities`)
+    only the tiles it covered or now covers are redrawn.
+    """
+
+    # movement types of entities that stay where they are
+    STATIC_TYPES = frozenset(
+        (
+            MovementType.STATIC,
+            MovementType.HOLE,
+            MovementType.WALKABLE,
+            MovementType.FOREGROUND,
+        )
+    )
+    # pixel rows of the base, and entities, drawn per step of `bake`
+    BAKE_ROWS = 128
+    BAKE_ENTITIES = 64
+
+    def __init__(
+        self,
+        size: tuple[int, int],
+        entities: list[Entity],
+        base: pygame.Surface | None = None,
+    ) -> None:
+        # what's under the entities, None for nothing
+        self.base = base
+        self.entities = entities
+        self.surface = pygame.Surface(size, pygame.SRCALPHA)
+        self.baked: dict[Entity, pygame.Rect] = {}
+        # only blit the part of the layer that has something on it. It grows
+        # as entities are baked in, but isn't worth shrinking when they leave
+        self.bounds = pygame.Rect(0, 0, 0, 0)
+        self.dynamic_entities: list[Entity] = []
+
+    def bake(self) -> t.Iterator[None]:
+        """Draws the base and the entities that can't move onto the layer,
+        yielding between parts so that `RoomPreloader` can spread them over
+        frames. The layer can't be drawn until it's done."""
+        if self.base is not None:
+            width, height = self.surface.get_size()
+            for y in range(0, height, StaticLayer.BAKE_ROWS):
+                band = pygame.Rect(0, y, width, StaticLayer.BAKE_ROWS)
+                # adding onto transparent pixels copies the base as is
+                self.surface.blit(
+                    self.base, band, band, special_flags=pygame.BLEND_RGBA_ADD
+                )
+                yield
+            base_bounds = self.base.get_bounding_rect()
+            if base_bounds.w and base_bounds.h:
+                self.add_to_bounds(base_bounds)
+
+        for index, entity in enumerate(self.entities):
+            if self.is_static(entity):
+                self.baked[entity] = entity.image.get_rect(topleft=entity.pos)
+                self.surface.blit(entity.image, self.baked[entity])
+                self.add_to_bounds(self.baked[entity])
+            if index % StaticLayer.BAKE_ENTITIES == StaticLayer.BAKE_ENTITIES - 1:
+                yield
+        self.on_baked_changed()
+
+    @staticmethod
+    def is_static(entity: Entity) -> bool:
+        return (
+            entity.STATIC_IMAGE
+            and not entity.IN_BACKGROUND
+            and entity.is_visible
+            and entity.movement_type in StaticLayer.STATIC_TYPES
+        )
+
+    def add_to_bounds(self, rect: pygame.Rect) -> None:
+        if self.bounds.w and self.bounds.h:
+            self.bounds.union_ip(rect)
+        else:
+            self.bounds = rect.copy()
+
+    def on_baked_changed(self) -> None:
+        self.dynamic_entities = [
+            entity
+            for entity in self.entities
+            if entity not in self.baked and not entity.IN_BACKGROUND
+        ]
+
+    def refresh(self, changed_entities: set[Entity]) -> None:
+        dirty_rects: list[pygame.Rect] = []
+        for entity in changed_entities:
+            old_rect = self.baked.pop(entity, None)
+            if entity in self.entities and self.is_static(entity):
+                self.baked[entity] = entity.image.get_rect(topleft=entity.pos)
+                self.add_to_bounds(self.baked[entity])
+            new_rect = self.baked.get(entity)
+            if old_rect != new_rect:
+                dirty_rects.extend(rect for rect in (old_rect, new_rect) if rect)
+
+        if not dirty_rects:
+            return
+        # the old surface may already have been drawn this frame, so change a
+        # copy (see Renderer)
+        self.surface = self.surface.copy()
+        for rect in dirty_rects:
+            self.redraw(rect)
+        self.on_baked_changed()
+
+    def redraw(self, rect: pygame.Rect) -> None:
+        self.surface.fill((0, 0, 0, 0), rect)
+        if self.base is not None:
+            self.surface.blit(
+                self.base, rect, rect, special_flags=pygame.BLEND_RGBA_ADD
+            )
+        self.surface.set_clip(rect)
+        for entity in self.entities:
+            baked_rect = self.baked.get(entity)
+            if baked_rect is not None and baked_rect.colliderect(rect):
+                self.surface.blit(entity.image, baked_rect)
+        self.surface.set_clip(None)
+
+    def draw(self) -> None:
+        if self.bounds.w and self.bounds.h:
+            # offset from the room's origin, so every layer lines up
+            x, y = get_relative_pos(pygame.Vector2())
+            shared.screen.blit(
+                self.surface,
+                (int(x) + self.bounds.x, int(y) + self.bounds.y),
+                self.bounds,
+            )
+        for entity in self.dynamic_entities:
+            entity.draw()
 
 
 class Grid:
@@ -34,8 +174,44 @@ class Grid:
         "magic-hole": MagicHole,
     }
     LOADED_BACKGROUNDS: dict[int, pygame.Surface] = {}
+    # first visits to the rooms next door, built ahead of time by
+    # RoomPreloader, by room id
+    PREPARED: dict[int, PreparedRoom] = {}
+    # tiles placed, or walls and doors drawn, per step of `build`
+    BUILD_TILES = 64
 
     def __init__(self) -> None:
+        self.load_entities()
+
+    @staticmethod
+    def load() -> Grid:
+        """Returns the current room's Grid, the one in `PREPARED` if it's
+        this visit's."""
+        prepared = Grid.PREPARED.pop(shared.room_id, None)
+        if prepared is not None and prepared.is_current_room():
+            return prepared.enter()
+        return Grid()
+
+    def load_entities(self):
+        saved_entities = shared.entities_in_room.get(shared.room_id)
+        if saved_entities is None:
+            for _ in self.build():
+                pass
+            return
+
+        shared.entities = saved_entities
+        self.background = Grid.LOADED_BACKGROUNDS[shared.room_id]
+        for i, entity in enumerate(shared.entities):
+            if isinstance(entity, Player):
+                shared.entities[i] = shared.player
+                break
+        shared.spatial_hash = SpatialHash(shared.entities)
+        for _ in self.set_up():
+            pass
+
+    def build(self) -> t.Iterator[None]:
+        """Loads the first visit to the current room, yielding between the
+        slow parts so that `RoomPreloader` can spread them over frames."""
         self.background = pygame.Surface(
             (
                 shared.TILE_SIDE * shared.room_map.width,
@@ -43,47 +219,57 @@ class Grid:
             ),
             pygame.SRCALPHA,
         )
-        self.load_entities()
-
-    def load_entities(self):
-        saved_entities = shared.entities_in_room.get(shared.room_id)
-        if saved_entities is None:
-            shared.entities = []
-            self.load_entities_from_room()
-            self.blit_walls_to_bg()
-            Grid.LOADED_BACKGROUNDS[shared.room_id] = self.background.copy()
-        else:
-            shared.entities = saved_entities
-            self.background = Grid.LOADED_BACKGROUNDS[shared.room_id]
-            for i, entity in enumerate(shared.entities):
-                if isinstance(entity, Player):
-                    shared.entities[i] = shared.player
-                    break
+        shared.entities = []
+        shared.spatial_hash = SpatialHash()
+        # a big room's surfaces take a few milliseconds each to make
+        yield
+        yield from self.load_entities_from_room()
+        yield from self.blit_walls_to_bg()
+        Grid.LOADED_BACKGROUNDS[shared.room_id] = self.background
+        yield from self.set_up()
 
+    def set_up(self) -> t.Iterator[None]:
+        """Makes what's drawn and searched from the room's entities."""
         self.bg_entities, self.fg_entities = self.filter_entities()
         self.align_player_pos()
-        shared.cells = [entity.cell for entity in shared.entities]
+        shared.graph = Graph()
+        yield
+        yield from shared.graph.build()
+
+        shared.spatial_hash.pop_changed_entities()
+        size = self.background.get_size()
+        yield
+        self.bg_layer = StaticLayer(size, self.bg_entities, self.background)
+        yield
+        yield from self.bg_layer.bake()
+        yield
+        self.fg_layer = StaticLayer(size, self.fg_entities)
+        yield
+        yield from self.fg_layer.bake()
 
     def add_entity(self, entity: Entity) -> None:
         shared.entities.append(entity)
+        shared.spatial_hash.add(entity)
         if entity.movement_type == MovementType.PATHING:
             entity.pos = pygame.Vector2(-100, -100)
 
     def remove_unused_entities(self) -> None:
-        all_entities = shared.entities
-        for entity in all_entities:
-            if not entity.is_alive:
-                shared.entities.remove(entity)
+        for entity in [entity for entity in shared.entities if not entity.is_alive]:
+            shared.entities.remove(entity)
+            shared.spatial_hash.remove(entity)
 
+    @profiled("Grid.update")
     def update(self) -> None:
         self.remove_unused_entities()
         for entity in shared.entities:
             entity.update()
 
-    def blit_walls_to_bg(self):
-        for entity in shared.entities:
-            if isinstance(entity, Wall) or isinstance(entity, Door):
-                self.blit_to_bg(entity.cell[1], entity.cell[0], entity.image)
+    def blit_walls_to_bg(self) -> t.Iterator[None]:
+        walls = [entity for entity in shared.entities if entity.IN_BACKGROUND]
+        for index, entity in enumerate(walls):
+            self.blit_to_bg(entity.cell[1], entity.cell[0], entity.image)
+            if index % Grid.BUILD_TILES == Grid.BUILD_TILES - 1:
+                yield
 
     def blit_to_bg(self, row, col, image):
         self.background.blit(image, (col * shared.TILE_SIDE, row * shared.TILE_SIDE))
@@ -97,7 +283,8 @@ class Grid:
             return
         self.add_entity(entity((col, row), image, properties))
 
-    def load_entities_from_room(self) -> None:
+    def load_entities_from_room(self) -> t.Iterator[None]:
+        placed = 0
         for layer in shared.room_map.layers:
             for x, y, image in layer.tiles():
                 gid = layer.data[y][x]
@@ -109,16 +296,21 @@ class Grid:
                 self.place_entity(
                     y, x, entity_id=entity_id, image=image, properties=properties
                 )
+                placed += 1
+                if placed % Grid.BUILD_TILES == 0:
+                    yield
 
     def align_player_pos(self) -> None:
         for entity in shared.entities:
             if isinstance(entity, Door) and entity.door_direction == shared.next_door:
-                player_index = shared.entities.index(shared.player)
+                old_player = shared.player
+                player_index = shared.entities.index(old_player)
                 shared.entities[player_index] = Player(
                     entity.cell,
-                    shared.player.image,
-                    shared.player.properties,
+                    old_player.image,
+                    old_player.properties,
                 )
+                shared.spatial_hash.replace(old_player, shared.player)
 
                 return
 
@@ -145,23 +337,109 @@ class Grid:
             else:
                 background_entities.append(entity)
 
-            # this just forces holes to be the first things drawn
-            background_entities.sort(
-                key=lambda e: (
-                    int(not isinstance(e, Hole)),
-                    int(e.movement_type != MovementType.WALKABLE),
-                )
+        # this just forces holes to be the first things drawn
+        background_entities.sort(
+            key=lambda e: (
+                int(not isinstance(e, Hole)),
+                int(e.movement_type != MovementType.WALKABLE),
             )
-            background_entities.sort(key=lambda e: int(not isinstance(e, MagicHole)))
+        )
+        background_entities.sort(key=lambda e: int(not isinstance(e, MagicHole)))
 
         return background_entities, foreground_entities
 
     def draw(self) -> None:
         # self.draw_grid()
-        shared.screen.blit(self.background, get_relative_pos(pygame.Vector2()))
+        changed_entities = shared.spatial_hash.pop_changed_entities()
+        if changed_entities:
+            self.bg_layer.refresh(changed_entities)
+            self.fg_layer.refresh(changed_entities)
 
-        for entity in self.bg_entities:
-            entity.draw()
+        self.bg_layer.draw()
         shared.player.draw()
-        for entity in self.fg_entities:
-            entity.draw()
+        self.fg_layer.draw()
+
+
+class PreparedRoom:
+    """The first visit to a room next to the current one, built a step at a
+    time by `RoomPreloader` so that walking in only has to swap it in.
+
+    Loading a room reads and sets values in `shared`, like `shared.entities`,
+    so each step runs with the room's own values swapped in and puts the
+    current room's back afterwards.
+    """
+
+    # what in `shared` loading a room reads or sets
+    SHARED_NAMES = (
+        "room_id",
+        "next_door",
+        "room_map",
+        "rows",
+        "cols",
+        "entities",
+        "spatial_hash",
+        "player",
+        "graph",
+    )
+    MISSING = object()
+
+    def __init__(
+        self, room_id: int, next_door: DoorDirection, room_map: pytmx.TiledMap
+    ) -> None:
+        self.room_id = room_id
+        self.next_door = next_door
+        self.room_map = room_map
+        self.values: dict[str, t.Any] = {
+            "room_id": room_id,
+            "next_door": next_door,
+            "room_map": room_map,
+            "rows": room_map.height,
+            "cols": room_map.width,
+        }
+        # built in steps, rather than loading the current room
+        self.grid = Grid.__new__(Grid)
+        self.steps = self.grid.build()
+        self.done = False
+
+    def is_current_room(self) -> bool:
+        """Whether the player just walked into this room for the first time,
+        through the door it was built for."""
+        return (
+            shared.room_id == self.room_id
+            and shared.next_door == self.next_door
+            and shared.room_map is self.room_map
+            and self.room_id not in shared.entities_in_room
+        )
+
+    def step(self) -> None:
+        """Runs a step of the build, setting `done` once there are none left."""
+        current = {
+            name: getattr(shared, name, PreparedRoom.MISSING)
+            for name in PreparedRoom.SHARED_NAMES
+        }
+        for name, value in self.values.items():
+            setattr(shared, name, value)
+        try:
+            next(self.steps)
+        except StopIteration:
+            self.done = True
+        finally:
+            self.values = {
+                name: getattr(shared, name)
+                for name in PreparedRoom.SHARED_NAMES
+                if hasattr(shared, name)
+            }
+            for name, value in current.items():
+                if value is not PreparedRoom.MISSING:
+                    setattr(shared, name, value)
+                elif hasattr(shared, name):
+                    delattr(shared, name)
+
+    def enter(self) -> Grid:
+        """Makes the room the current one, finishing its build first if needed,
+        and returns its Grid."""
+        while not self.done:
+            self.step()
+        for name, value in self.values.items():
+            setattr(shared, name, value)
+        return self.grid
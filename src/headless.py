@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import time
+import typing as t
+
+import pygame
+
+from . import shared
+from .core import Core
+from .gamestate import GameStateManager
+
+# the events to inject on each frame, frames without an entry get none
+InputScript = t.Mapping[int, t.Sequence[pygame.event.Event]]
+
+
+class ScriptedKeys:
+    """Stands in for `pygame.key.get_pressed()`, following the scripted events."""
+
+    def __init__(self) -> None:
+        self.pressed: set[int] = set()
+
+    def __getitem__(self, key: int) -> bool:
+        return key in self.pressed
+
+    def update(self, events: t.Iterable[pygame.event.Event]) -> None:
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                self.pressed.add(event.key)
+            elif event.type == pygame.KEYUP:
+                self.pressed.discard(event.key)
+
+
+class HeadlessCore(Core):
+    """Runs the game without a window or audio device, as fast as it can.
+
+    Every frame lasts exactly `dt` seconds, and input comes from `script`
+    instead of the event queue. With the same script and seed two runs play
+    out the same.
+
+    Drawing takes most of a frame, `render=False` skips it. Whatever advances
+    in `draw` then stands still, like the death screen's animation.
+    """
+
+    def __init__(
+        self,
+        script: InputScript | None = None,
+        dt: float = 1 / 60,
+        seed: int = 0,
+        render: bool = True,
+    ) -> None:
+        self.script = {} if script is None else script
+        self.dt = dt
+        self.render = render
+        self.frame = 0
+        self.keys = ScriptedKeys()
+        self.mouse_pos = (0, 0)
+
+        random.seed(seed)
+        super().__init__()
+
+    def win_init(self) -> None:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+        super().win_init()
+
+    def get_events(self) -> list[pygame.event.Event]:
+        # nothing reads the real queue, don't let it fill up
+        pygame.event.clear()
+        events = list(self.script.get(self.frame, ()))
+        self.keys.update(events)
+        for event in events:
+            if hasattr(event, "pos"):
+                self.mouse_pos = event.pos
+        return events
+
+    def get_dt(self) -> float:
+        return self.dt
+
+    def get_keys(self) -> ScriptedKeys:  # type: ignore[override]
+        return self.keys
+
+    def get_mouse_pos(self) -> tuple[int, int]:
+        return self.mouse_pos
+
+    def step(self) -> None:
+        self.update()
+        if self.render:
+            self.draw()
+        self.frame += 1
+
+
+def random_script(frames: int, seed: int = 0, interval: int = 15) -> InputScript:
+    """Taps a random arrow key every `interval` frames."""
+    rng = random.Random(seed)
+    arrows = (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT)
+    script: dict[int, list[pygame.event.Event]] = {}
+    for frame in range(0, frames, interval):
+        key = rng.choice(arrows)
+        script.setdefault(frame, []).append(pygame.event.Event(pygame.KEYDOWN, key=key))
+        script.setdefault(frame + interval // 2, []).append(
+            pygame.event.Event(pygame.KEYUP, key=key)
+        )
+    return script
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Plays random runs of the game without a display."
+    )
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-render", action="store_true")
+    args = parser.parse_args()
+
+    core = HeadlessCore(
+        random_script(args.frames, args.seed),
+        seed=args.seed,
+        render=not args.no_render,
+    )
+    GameStateManager().set_state("PlayState")
+
+    deaths = 0
+    rooms = set()
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        core.step()
+        state = GameStateManager().state
+        if state is None:
+            continue
+        if state.name == "PlayState":
+            rooms.add(shared.room_id)
+        elif state.name == "DeathScreen":
+            deaths += 1
+            shared.reset = True
+    seconds = time.perf_counter() - start
+
+    print(
+        f"{args.frames} frames in {seconds:.2f}s "
+        f"({args.frames / seconds:.0f} fps), "
+        f"rooms {sorted(rooms)}, deaths {deaths}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import typing as t
+from contextlib import contextmanager
+
+import pygame
+
+from . import shared
+
+# an object and the name of its pygame.Vector2 or rect attribute
+Target = tuple[t.Any, str]
+Position = t.Union[pygame.Vector2, pygame.Rect, pygame.FRect]
+
+
+class Interpolator:
+    """Draws the game part of the way between its last two simulation steps.
+
+    Positions are captured before each step. While drawing, they're moved
+    `alpha` of the way from the captured ones to the current ones, and put
+    back afterwards. Rects are moved by their center, since they can change
+    size between steps.
+    """
+
+    # jumps further than this, like going through a door, aren't smoothed
+    MAX_DISTANCE = shared.TILE_SIDE * 2
+
+    def __init__(self) -> None:
+        self.previous: list[tuple[t.Any, str, pygame.Vector2]] = []
+
+    @staticmethod
+    def get_point(position: Position) -> pygame.Vector2:
+        if isinstance(position, pygame.Vector2):
+            return position.copy()
+        return pygame.Vector2(position.center)
+
+    def capture(self, targets: t.Iterable[Target]) -> None:
+        self.previous = [
+            (obj, name, self.get_point(getattr(obj, name))) for obj, name in targets
+        ]
+
+    @contextmanager
+    def interpolate(self, alpha: float) -> t.Iterator[None]:
+        current: list[tuple[t.Any, str, Position]] = []
+        for obj, name, previous in self.previous:
+            position = getattr(obj, name)
+            point = self.get_point(position)
+            if point == previous or (
+                point.distance_squared_to(previous) > Interpolator.MAX_DISTANCE**2
+            ):
+                continue
+
+            between = previous.lerp(point, alpha)
+            if isinstance(position, pygame.Vector2):
+                setattr(obj, name, between)
+            else:
+                setattr(obj, name, position.copy())
+                getattr(obj, name).center = between
+            current.append((obj, name, position))
+
+        try:
+            yield
+        finally:
+            for obj, name, position in reversed(current):
+                setattr(obj, name, position)
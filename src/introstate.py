@@ -7,13 +7,18 @@ from .asset_loader import Loader
 from .common import Time, get_path
 from .gamestate import GameState, GameStateManager
 from .glitch import Glitch
+from .text import TextLayout, Typewriter
 
 
 class IntroState(GameState):
+    FONT = "assets/font/DotGothic16-Regular.ttf", 30
+
     def __init__(self) -> None:
         super().__init__("IntroState")
-        self.font = Loader().get_font("assets/font/DotGothic16-Regular.ttf", 30)
+        self.font = Loader().get_font(*IntroState.FONT)
+        self.atlas = Loader().get_glyph_atlas(*IntroState.FONT, "white")
         self.scenes: dict[int, tuple[str, int]] = {}
+        self.layouts: dict[int, TextLayout] = {}
         self.load_scenes()
         self.reset()
         self.character_timer = Time(self.character_delay)
@@ -26,6 +31,9 @@ class IntroState(GameState):
             with open(file, "r") as scene:
                 text = scene.read()
                 self.scenes[number] = text, len(text.split("(Press any key")[0])
+                self.layouts[number] = TextLayout(
+                    text, self.font, shared.screen.get_width()
+                )
 
         with open(get_path("assets/intro/instructions.txt"), "r") as instructs:
             text = instructs.read()
@@ -47,6 +55,7 @@ class IntroState(GameState):
         self.current_scene += 1
         self.character_index = 0
         self.ready_to_continue = False
+        self.typewriter = Typewriter(self.layouts[self.current_scene], self.atlas)
         if self.current_scene >= 2 and shared.menu_audio is None:
             self.start_music()
 
@@ -64,6 +73,7 @@ class IntroState(GameState):
         self.character_index = 0
         self.character_delay = 0.1  # seconds
         self.ready_to_continue = False
+        self.typewriter = Typewriter(self.layouts[self.current_scene], self.atlas)
 
     def handle_events(self) -> None:
         for event in shared.events:
@@ -88,12 +98,9 @@ class IntroState(GameState):
         self.glitch.update()
 
     def draw(self) -> None:
-        text = self.scenes[self.current_scene][0][: self.character_index]
-        rendered = self.font.render(
-            text, True, "white", wraplength=shared.screen.get_width()
-        )
-
-        shared.screen.blit(rendered, (0, 0))
+        # only the characters revealed since the last frame are drawn
+        self.typewriter.reveal(self.character_index)
+        shared.screen.blit(self.typewriter.surface, (0, 0))
         shared.screen.blit(
             self.instructions,
             self.instructions.get_rect(
@@ -22,6 +22,9 @@ def quit() -> None:
 
 
 class MainMenu(GameState):
+    # nothing moves until the mouse does
+    FRAME_RATE = None
+
     def __init__(self) -> None:
         super().__init__("MainMenu")
         self.font = Loader().get_font("assets/font/DotGothic16-Regular.ttf", 60)
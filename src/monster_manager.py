@@ -1,22 +1,25 @@
 import random
+from collections import defaultdict
 
 import pygame
 
 from . import shared
-from .anim import Animation, get_frames
+from .anim import Animation, Clip, ClipRegistry, get_frames
 from .asset_loader import Loader
 from .common import Time, get_path, render_at
 from .entities import Door
 from .enums import DoorDirection
 from .gameobject import GameObject
 from .gamestate import GameStateManager
-from .graph import Graph
+from .profiler import profiled
 
 
 class Monster(GameObject):
     def __init__(self) -> None:
         if not hasattr(self, "new_pos"):
             self.new_pos = (0, 0)
+        self.room = -1
+        self.last_room = -1
         self.init_anim()
         super().__init__(
             pos=pygame.Vector2(),
@@ -33,7 +36,8 @@ class Monster(GameObject):
         self.cooldown_timer = Time(60)
         self.on_cooldown = False
 
-    def init_anim(self) -> None:
+    @staticmethod
+    def load_clips() -> dict[tuple[int, int], Clip]:
         frames = get_frames(get_path("assets/art/monster-64.png"), (64, 64))
 
         for index, frame in enumerate(frames):
@@ -51,12 +55,16 @@ class Monster(GameObject):
         ]
         north_frames = frames[8:12]
         anim_cd = 0.2
-        self.anims = {
-            (0, -1): Animation(north_frames, anim_cd),
-            (1, 0): Animation(east_frames, anim_cd),
-            (-1, 0): Animation(west_frames, anim_cd),
-            (0, 1): Animation(south_frames, anim_cd),
+        return {
+            (0, -1): Clip(north_frames, anim_cd),
+            (1, 0): Clip(east_frames, anim_cd),
+            (-1, 0): Clip(west_frames, anim_cd),
+            (0, 1): Clip(south_frames, anim_cd),
         }
+
+    def init_anim(self) -> None:
+        clips = ClipRegistry().get("monster", Monster.load_clips)
+        self.anims = {direction: Animation(clip) for direction, clip in clips.items()}
         self.last_pos = pygame.Vector2()
 
     def align_pos_with_door(self, door_direction: DoorDirection):
@@ -75,11 +83,26 @@ class Monster(GameObject):
 
         return (0, 1)
 
+    def get_next_pos(self) -> pygame.Vector2:
+        monster_cell = int(self.pos.y / shared.TILE_SIDE), int(
+            self.pos.x / shared.TILE_SIDE
+        )
+        player_cell = int(shared.player.cell.y), int(shared.player.cell.x)
+
+        distance_field = shared.graph.distance_field
+        distance_field.update(player_cell)
+        next_cell = distance_field.next_cell(monster_cell)
+        if next_cell is None:
+            # the player is walled off from here, so head straight for them
+            path = shared.graph.search(monster_cell, player_cell)
+            next_cell = path[1] if len(path) > 1 else monster_cell
+
+        return (pygame.Vector2(next_cell) * shared.TILE_SIDE).yx
+
     def pathfind_to_player(self) -> None:
         """
-        Just moves toward the player in a straight line for now. When implementing
-        actual pathfinding you can use `shared.entities` which contain the absolute pos
-        as `Entity.pos` and their rect as `Entity.rect` which you may require.
+        Moves toward the player one cell at a time by descending the distance
+        field rooted at the player, which every monster in the room shares.
         """
         if (
             shared.monster_audio is not None
@@ -88,29 +111,10 @@ class Monster(GameObject):
             shared.monster_audio.play(-1)
         self.chasing = True
 
-        if shared.update_graph:
-            shared.update_graph = False
-            shared.graph = Graph()
-            shared.graph.create_graph()
-
-            monster_cell = int(self.pos.y / shared.TILE_SIDE), int(
-                self.pos.x / shared.TILE_SIDE
-            )
-            player_cell = int(shared.player.cell.y), int(shared.player.cell.x)
-            self.path = shared.graph.search(monster_cell, player_cell)
-            if self.pos == self.new_pos:
-                self.new_pos = (
-                    pygame.Vector2(self.path.popleft()) * shared.TILE_SIDE
-                ).yx
-
-        if self.path:
-            if self.pos == self.new_pos:
-                self.new_pos = (
-                    pygame.Vector2(self.path.popleft()) * shared.TILE_SIDE
-                ).yx
-            self.pos.move_towards_ip(
-                self.new_pos, shared.ENTITY_SPEED * 0.6 * shared.dt
-            )
+        shared.graph.sync()
+        if self.pos == self.new_pos:
+            self.new_pos = self.get_next_pos()
+        self.pos.move_towards_ip(self.new_pos, shared.ENTITY_SPEED * 0.6 * shared.dt)
 
     def update_anim(self) -> None:
         anim = self.anims.get(self.get_delta_direction())
@@ -130,48 +134,76 @@ class Monster(GameObject):
 
 
 class MonsterManager:
+    """Owns every monster and the room each of them is roaming.
+
+    Only monsters in the player's room get the full `Monster.update`; the rest
+    just hop between rooms on a shared timer.
+    """
+
     PLAYER_CHASE_DISTANCE = 200
     CHASE_INTERVAL = 1.0
+    # rooms the monsters start out in, furthest from the first room first
+    SPAWN_ROOMS = (9, 7, 3, 8, 6, 4, 2, 5)
+    # Maps the diff to the entrance direction
+    ROOM_DIFFS = {
+        -1: DoorDirection.EAST,
+        1: DoorDirection.WEST,
+        -3: DoorDirection.SOUTH,
+        3: DoorDirection.NORTH,
+    }
 
     def __init__(self) -> None:
-        self.room = 9
-        self.last_room = -1
+        self.rooms: dict[int, list[Monster]] = defaultdict(list)
         self.move_chance = 0.3
         self.move_time = 5  # seconds
         self.timer = Time(self.move_time)
-        self.create_monster()
+        self.create_monsters()
 
-    def create_monster(self):
-        self.must_align = False
+    @property
+    def chasing(self) -> bool:
+        return any(monster.chasing for monster in shared.monsters)
+
+    def create_monsters(self):
+        # monsters that followed the player out of the last room
+        self.followers: list[Monster] = []
         self.align_timer = Time(
             MonsterManager.CHASE_INTERVAL
         )  # Wait 1 second before entering the next room
         # with the player
 
-        if not hasattr(shared, "monster"):
-            shared.monster = Monster()
-
-        # If the monster was still chasing the player while
-        # he moved into the next room, chase him into the next room as well
-        if (
-            shared.monster.chasing
-            and shared.monster.pos.distance_to(shared.player.pos)
-            < MonsterManager.PLAYER_CHASE_DISTANCE
-        ):
-            self.must_align = True
-
-    def change_room(self):
-        if not self.timer.tick() or random.random() > self.move_chance:
-            shared.monster.chasing = False
-            return
+        if not hasattr(shared, "monsters"):
+            shared.monsters = [Monster() for _ in range(shared.MONSTER_COUNT)]
+
+        for index, monster in enumerate(shared.monsters):
+            # If the monster was still chasing the player while
+            # he moved into the next room, chase him into the next room as well
+            if (
+                monster.chasing
+                and monster.pos.distance_to(shared.player.pos)
+                < MonsterManager.PLAYER_CHASE_DISTANCE
+            ):
+                self.followers.append(monster)
+                continue
+
+            monster.chasing = False
+            spawn_rooms = MonsterManager.SPAWN_ROOMS
+            self.set_room(monster, spawn_rooms[index % len(spawn_rooms)])
+
+    def set_room(self, monster: Monster, room: int) -> None:
+        if monster in self.rooms[monster.room]:
+            self.rooms[monster.room].remove(monster)
+        monster.room = room
+        self.rooms[room].append(monster)
+
+    def get_off_screen_monsters(self) -> list[Monster]:
+        return [
+            monster
+            for room, monsters in self.rooms.items()
+            if room != shared.room_id
+            for monster in monsters
+        ]
 
-        # Maps the diff to the entrance direction
-        diffs = {
-            -1: DoorDirection.EAST,
-            1: DoorDirection.WEST,
-            -3: DoorDirection.SOUTH,
-            3: DoorDirection.NORTH,
-        }
+    def change_room(self, monster: Monster):
         possible_rooms = []
 
         # store the possible diffs as well, which will append the diff mapping
@@ -179,43 +211,60 @@ class MonsterManager:
         # possible room was chosen, with which we can assign the door from which
         # the monster enters
         possible_diffs = []
-        for diff in diffs:
-            test_room = self.room + diff
+        for diff in MonsterManager.ROOM_DIFFS:
+            test_room = monster.room + diff
             if abs(diff) == 3:
                 if 0 < test_room < 10:
                     possible_rooms.append(test_room)
                     possible_diffs.append(diff)
             else:
-                if (test_room - 1) // 3 == (self.room - 1) // 3:
+                if (test_room - 1) // 3 == (monster.room - 1) // 3:
                     possible_rooms.append(test_room)
                     possible_diffs.append(diff)
 
-        if shared.monster.on_cooldown:
-            if shared.monster.cooldown_timer.tick():
-                shared.monster.on_cooldown = False
+        if monster.on_cooldown:
+            if monster.cooldown_timer.tick():
+                monster.on_cooldown = False
             elif shared.room_id in possible_rooms:
                 possible_rooms.remove(shared.room_id)
 
-        self.last_room = self.room
-        self.room = random.choice(possible_rooms)
+        monster.last_room = monster.room
+        self.set_room(monster, random.choice(possible_rooms))
 
-        if self.room == shared.room_id:
-            chosen_diff = possible_diffs[possible_rooms.index(self.room)]
-            shared.monster.align_pos_with_door(diffs[chosen_diff])
+        if monster.room == shared.room_id:
+            chosen_diff = possible_diffs[possible_rooms.index(monster.room)]
+            monster.align_pos_with_door(MonsterManager.ROOM_DIFFS[chosen_diff])
 
-    def update(self):
-        if self.must_align:
-            if self.align_timer.tick():
-                shared.monster.align_pos_with_door(shared.next_door)
-                self.room = shared.room_id
-                self.must_align = False
+    def roam_off_screen(self):
+        off_screen_monsters = self.get_off_screen_monsters()
+        if not off_screen_monsters or not self.timer.tick():
             return
 
-        if self.room == shared.room_id:
-            shared.monster.update()
+        for monster in off_screen_monsters:
+            if random.random() > self.move_chance:
+                continue
+            self.change_room(monster)
+
+    def align_followers(self):
+        if not self.align_timer.tick():
             return
-        self.change_room()
+
+        for monster in self.followers:
+            monster.align_pos_with_door(shared.next_door)
+            self.set_room(monster, shared.room_id)
+        self.followers.clear()
+
+    @profiled("MonsterManager.update")
+    def update(self):
+        # followers start moving the frame after they come through the door
+        monsters_in_room = tuple(self.rooms[shared.room_id])
+        if self.followers:
+            self.align_followers()
+
+        for monster in monsters_in_room:
+            monster.update()
+        self.roam_off_screen()
 
     def draw(self):
-        if self.room == shared.room_id:
-            shared.monster.draw()
+        for monster in self.rooms[shared.room_id]:
+            monster.draw()
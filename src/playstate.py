@@ -1,29 +1,33 @@
 import pygame
 
-import pytmx
-
 from . import shared
 from .asset_loader import Loader
 from .button import Button
 from .combination_lock import CombinationLock
 from .common import get_path
 from .entities import Door, Hole, Stone, Torch
-from .enums import DoorDirection
+from .enums import DoorDirection, MovementType
 from .gamestate import GameState, GameStateManager
 from .grid import Grid
 from .monster_manager import MonsterManager
+from .profiler import profiled
 from .puzzle_manager import PuzzleManager
+from .renderer import smoothscale_to
+from .room_cache import RoomCache
 
 
 def load_room():
     """Loads room from room ID"""
-    shared.room_map = pytmx.load_pygame(get_path(f"assets/data/rooms/{shared.room_id}.tmx"))  # type: ignore
+    shared.room_map = RoomCache().get_room_map(shared.room_id)
     shared.rows = shared.room_map.height
     shared.cols = shared.room_map.width
 
 
 class PlayState(GameState):
     DEBUG_ROOM = 8
+    DIRTY_RECTS = True
+    # movement types of entities that can go somewhere between two steps
+    MOVING_TYPES = frozenset((MovementType.PUSHED, MovementType.CONTROLLED))
 
     def __init__(self) -> None:
         super().__init__("PlayState")
@@ -45,13 +49,20 @@ class PlayState(GameState):
     def game_init(self):
         load_room()
         self.monster_manager = MonsterManager()
-        self.grid = Grid()
+        self.grid = Grid.load()
         shared.camera_pos = pygame.Vector2(shared.player.rect.center)
         self.cam_speed = shared.ENTITY_SPEED * 0.65
-        shared.overlay = pygame.Surface(shared.WIN_SIZE)
+        self.lighting_init()
         self.puzzle_manager = PuzzleManager()
         self.comb_lock = CombinationLock()
-        shared.update_graph = True
+
+    def lighting_init(self):
+        scale = shared.LIGHTING_SCALE
+        # rounded up, so the upscaled lights still cover the whole screen
+        size = -(-shared.WIN_WIDTH // scale), -(-shared.WIN_HEIGHT // scale)
+        shared.overlay = pygame.Surface(size)
+        if scale > 1:
+            self.light_buffer = pygame.Surface((size[0] * scale, size[1] * scale))
 
     def audio_init(self):
         if shared.game_audio is None:
@@ -116,7 +127,7 @@ class PlayState(GameState):
     def handle_events(self) -> None:
         for event in shared.events:
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r and not shared.monster.chasing:
+                if event.key == pygame.K_r and not self.monster_manager.chasing:
                     GameStateManager().set_state("PlayState")
 
     def handle_camera(self) -> None:
@@ -129,7 +140,7 @@ class PlayState(GameState):
 
     def stop_monster_audio_if_not_chasing(self) -> None:
         if (
-            not shared.monster.chasing
+            not self.monster_manager.chasing
             and shared.monster_audio is not None
             and shared.monster_audio.get_num_channels()
         ):
@@ -148,19 +159,34 @@ class PlayState(GameState):
         self.puzzle_manager.update()
         self.comb_lock.update()
 
+    def get_interpolated(self):
+        yield shared, "camera_pos"
+        yield shared.player, "pos"
+        yield shared.player.bloom, "rect"
+        for layer in (self.grid.bg_layer, self.grid.fg_layer):
+            for entity in layer.dynamic_entities:
+                if entity.moving or entity.movement_type in PlayState.MOVING_TYPES:
+                    yield entity, "pos"
+        for monster in self.monster_manager.rooms[shared.room_id]:
+            yield monster, "pos"
+
     def draw_buttons(self):
         for button in self.buttons:
             button.draw()
 
+    @profiled("PlayState.draw_lighting")
+    def draw_lighting(self) -> None:
+        light = shared.overlay
+        if shared.LIGHTING_SCALE > 1:
+            smoothscale_to(shared.overlay, self.light_buffer)
+            light = self.light_buffer
+        shared.screen.blit(light, (0, 0), special_flags=pygame.BLEND_RGBA_MIN)
+
     def draw(self) -> None:
         shared.overlay.fill("black")
         self.grid.draw()
         self.monster_manager.draw()
         self.puzzle_manager.draw()
-        shared.screen.blit(
-            shared.overlay.subsurface(shared.screen.get_rect()),
-            (0, 0),
-            special_flags=pygame.BLEND_RGBA_MIN,
-        )
+        self.draw_lighting()
         self.comb_lock.draw()
         # self.draw_buttons()
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import csv
+import functools
+import math
+import time
+import typing as t
+from collections import deque
+from contextlib import contextmanager
+
+import pygame
+
+from . import shared
+from .asset_loader import Loader
+
+P = t.ParamSpec("P")
+R = t.TypeVar("R")
+
+
+class Profiler:
+    """Times named scopes of the frame, see `profiled` and `Profiler.scope`.
+
+    The last `WINDOW` calls of each scope are kept, and their percentiles are
+    shown in an on-screen HUD (F3) or written to a CSV file (F4). Scopes nest,
+    so a scope's time includes the scopes called inside it.
+    """
+
+    __instance = None
+    __initialized = False
+
+    WINDOW = 600
+    PERCENTILES = (50, 95, 99)
+    HUD_KEY = pygame.K_F3
+    DUMP_KEY = pygame.K_F4
+    # seconds between HUD refreshes, so the numbers can be read
+    HUD_INTERVAL = 0.5
+    HUD_POS = (10, 10)
+
+    def __new__(cls) -> Profiler:
+        if cls.__instance is None:
+            cls.__instance = object.__new__(cls)
+        return cls.__instance
+
+    def __init__(self) -> None:
+        if not Profiler.__initialized:
+            self.samples: dict[str, deque[float]] = {}
+            self.show_hud = False
+            self.hud: pygame.Surface | None = None
+            self.hud_time = 0.0
+            # the outcome of the last CSV dump, shown under the HUD
+            self.dump_status: str | None = None
+            Profiler.__initialized = True
+
+    def add_sample(self, name: str, seconds: float) -> None:
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=Profiler.WINDOW)
+        samples.append(seconds)
+
+    @contextmanager
+    def scope(self, name: str) -> t.Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_sample(name, time.perf_counter() - start)
+
+    @staticmethod
+    def get_percentile(ordered: list[float], percentile: int) -> float:
+        """Nearest-rank percentile of already sorted samples."""
+        rank = math.ceil(percentile / 100 * len(ordered))
+        return ordered[max(rank - 1, 0)]
+
+    def get_stats(self) -> list[dict[str, t.Any]]:
+        """Returns each scope's statistics, in milliseconds."""
+        stats = []
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            row: dict[str, t.Any] = {"scope": name, "calls": len(ordered)}
+            row["mean_ms"] = sum(ordered) / len(ordered) * 1000
+            for percentile in Profiler.PERCENTILES:
+                row[f"p{percentile}_ms"] = (
+                    self.get_percentile(ordered, percentile) * 1000
+                )
+            row["max_ms"] = ordered[-1] * 1000
+            stats.append(row)
+        return stats
+
+    def dump_csv(self, path: str | None = None) -> str:
+        if path is None:
+            path = time.strftime("profile-%Y%m%d-%H%M%S.csv")
+        stats = self.get_stats()
+        fields = ["scope", "calls", "mean_ms"]
+        fields += [f"p{percentile}_ms" for percentile in Profiler.PERCENTILES]
+        fields.append("max_ms")
+
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fields)
+            writer.writeheader()
+            for row in stats:
+                writer.writerow(
+                    {
+                        key: f"{value:.3f}" if isinstance(value, float) else value
+                        for key, value in row.items()
+                    }
+                )
+        return path
+
+    def handle_events(self) -> None:
+        for event in shared.events:
+            if event.type != pygame.KEYDOWN:
+                continue
+            if event.key == Profiler.HUD_KEY:
+                self.show_hud = not self.show_hud
+                self.hud = None
+            elif event.key == Profiler.DUMP_KEY:
+                try:
+                    self.dump_status = f"Profile written to {self.dump_csv()}"
+                except OSError as error:
+                    self.dump_status = f"Couldn't write profile: {error}"
+                self.show_hud = True
+                self.hud = None
+
+    def render_hud(self) -> pygame.Surface:
+        font = Loader().get_font("assets/font/DotGothic16-Regular.ttf", 16)
+        header = "".join(
+            f"{f'p{percentile}':>8}" for percentile in Profiler.PERCENTILES
+        )
+        lines = [f"{'ms':<24}{header}"]
+        for row in self.get_stats():
+            values = "".join(
+                f"{row[f'p{percentile}_ms']:>8.2f}"
+                for percentile in Profiler.PERCENTILES
+            )
+            lines.append(f"{row['scope']:<24}{values}")
+        if self.dump_status is not None:
+            lines.append(self.dump_status)
+
+        images = [font.render(line, False, "white") for line in lines]
+        hud = pygame.Surface(
+            (
+                max(image.get_width() for image in images) + 10,
+                sum(image.get_height() for image in images) + 10,
+            ),
+            pygame.SRCALPHA,
+        )
+        hud.fill((0, 0, 0, 180))
+        y = 5
+        for image in images:
+            hud.blit(image, (5, y))
+            y += image.get_height()
+        return hud
+
+    def draw(self) -> None:
+        if not self.show_hud:
+            return
+
+        now = time.perf_counter()
+        if self.hud is None or now - self.hud_time >= Profiler.HUD_INTERVAL:
+            # a new surface each refresh, the renderer only notices new ones
+            self.hud = self.render_hud()
+            self.hud_time = now
+        shared.screen.blit(self.hud, Profiler.HUD_POS)
+
+
+def profiled(name: str) -> t.Callable[[t.Callable[P, R]], t.Callable[P, R]]:
+    """Times every call of the decorated function under `name`."""
+
+    def decorator(function: t.Callable[P, R]) -> t.Callable[P, R]:
+        @functools.wraps(function)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                Profiler().add_sample(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
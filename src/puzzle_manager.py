@@ -4,7 +4,8 @@ from . import shared
 from .common import get_path
 from .entities import Door, Hole, MagicHole, Torch
 from .enums import DoorDirection
-from .gameobject import get_relative_pos
+from .gameobject import get_relative_pos, is_on_screen
+from .profiler import profiled
 
 
 class Lock:
@@ -44,7 +45,8 @@ class Lock:
         self.pos.y -= y * 48
 
     def draw(self):
-        shared.screen.blit(self.image, get_relative_pos(self.rect.topleft))
+        if is_on_screen(self.rect):
+            shared.screen.blit(self.image, get_relative_pos(self.rect.topleft))
 
 
 class PuzzleManager:
@@ -187,6 +189,7 @@ class PuzzleManager:
 
         PuzzleManager.SOLVED_ROOMS[shared.room_id] = False
 
+    @profiled("PuzzleManager.update")
     def update(self):
         if (
             shared.win
@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import typing as t
+from collections import Counter
+
+import pygame
+
+from . import shared
+from .profiler import profiled
+
+if t.TYPE_CHECKING:
+    from .gamestate import GameState
+
+
+class DrawOp(t.NamedTuple):
+    target: pygame.Surface
+    # the surface blitted, or the color of a fill
+    source: pygame.Surface | pygame.Color
+    dest: t.Any
+    area: pygame.Rect | None
+    special_flags: int
+    # what the op covers on the screen, where it actually lands
+    rect: pygame.Rect
+    # "blit", "fill" or "smoothscale" (source scaled to fill the target)
+    kind: str = "blit"
+    # screen pixels per target pixel
+    scale: int = 1
+
+    @property
+    def key(self) -> tuple:
+        """Compares equal for ops that draw the same pixels."""
+        source = self.source
+        if isinstance(source, pygame.Surface):
+            source = id(source)
+        else:
+            source = tuple(source)
+        area = None if self.area is None else tuple(self.area)
+        # a blit bigger than the screen can move without its clipped rect changing
+        dest = self.dest if self.kind == "blit" else None
+        return (
+            self.kind,
+            id(self.target),
+            source,
+            dest,
+            tuple(self.rect),
+            area,
+            self.special_flags,
+        )
+
+
+class DrawRecorder:
+    """Stands in for a surface while a frame is drawn.
+
+    Blits and fills are recorded instead of done, everything else goes
+    straight to the real surface. A surface drawn at a lower resolution than
+    the screen, and smoothscaled up before it's shown, is recorded with the
+    `scale` between the two.
+    """
+
+    def __init__(
+        self, surface: pygame.Surface, ops: list[DrawOp], scale: int = 1
+    ) -> None:
+        self.surface = surface
+        self.ops = ops
+        self.scale = scale
+
+    def __getattr__(self, name: str) -> t.Any:
+        return getattr(self.surface, name)
+
+    def to_screen(self, rect: pygame.Rect) -> pygame.Rect:
+        """Returns the screen area `rect` ends up affecting."""
+        scale = self.scale
+        if scale == 1:
+            return rect
+        # smoothscaling blends each pixel into its neighbours' share too
+        return pygame.Rect(
+            (rect.x - 1) * scale,
+            (rect.y - 1) * scale,
+            (rect.w + 2) * scale,
+            (rect.h + 2) * scale,
+        )
+
+    def blit(
+        self,
+        source: pygame.Surface | DrawRecorder,
+        dest: t.Any,
+        area: t.Any = None,
+        special_flags: int = 0,
+    ) -> pygame.Rect:
+        if isinstance(source, DrawRecorder):
+            source = source.surface
+        if area is None:
+            size = source.get_size()
+        else:
+            area = pygame.Rect(area)
+            size = area.clip(source.get_rect()).size
+        # blits truncate float positions, so does Rect
+        topleft = dest.topleft if isinstance(dest, pygame.Rect) else dest
+        rect = pygame.Rect(topleft, size)
+        dest = rect.topleft
+        rect = rect.clip(self.surface.get_rect())
+
+        self.ops.append(
+            DrawOp(
+                self.surface,
+                source,
+                dest,
+                area,
+                special_flags,
+                self.to_screen(rect),
+                "blit",
+                self.scale,
+            )
+        )
+        return rect
+
+    def fill(
+        self, color: t.Any, rect: t.Any = None, special_flags: int = 0
+    ) -> pygame.Rect:
+        rect = self.surface.get_rect() if rect is None else pygame.Rect(rect)
+        rect = rect.clip(self.surface.get_rect())
+
+        self.ops.append(
+            DrawOp(
+                self.surface,
+                pygame.Color(color),
+                rect,
+                None,
+                special_flags,
+                self.to_screen(rect),
+                "fill",
+                self.scale,
+            )
+        )
+        return rect
+
+    def smoothscale_to(self, dest: pygame.Surface) -> None:
+        # what changes is already covered by the ops drawn onto this surface
+        self.ops.append(
+            DrawOp(dest, self.surface, None, None, 0, pygame.Rect(), "smoothscale")
+        )
+
+
+def smoothscale_to(source: pygame.Surface | DrawRecorder, dest: pygame.Surface) -> None:
+    """Smoothscales `source` to fill `dest`, recording it if `source` is."""
+    if isinstance(source, DrawRecorder):
+        source.smoothscale_to(dest)
+    else:
+        pygame.transform.smoothscale(source, dest.get_size(), dest)
+
+
+class Renderer:
+    """Presents frames, redrawing only what changed when the state allows it.
+
+    In dirty rect mode a frame is drawn into `DrawRecorder`s standing in for
+    `shared.screen` and `shared.overlay`. Comparing the recorded ops with the
+    previous frame's gives the regions that changed, and only those are redrawn
+    (by replaying the frame clipped to them) and sent to the display.
+
+    `shared.overlay` has to cover the screen from (0, 0), at
+    1 / `shared.LIGHTING_SCALE` of its resolution. Surfaces mustn't be modified
+    in place once drawn, assign a new surface instead, or the change goes
+    unnoticed.
+    """
+
+    __instance = None
+    __initialized = False
+
+    # more rects than this are merged into one
+    MAX_RECTS = 8
+    # redrawing more than this share of the screen in pieces isn't worth it
+    MAX_DIRTY_AREA = 0.6
+    FULL_REDRAW_EVENTS = (
+        pygame.WINDOWEXPOSED,
+        pygame.WINDOWRESTORED,
+        pygame.WINDOWSIZECHANGED,
+        pygame.VIDEOEXPOSE,
+    )
+
+    def __new__(cls) -> Renderer:
+        if cls.__instance is None:
+            cls.__instance = object.__new__(cls)
+        return cls.__instance
+
+    def __init__(self) -> None:
+        if not Renderer.__initialized:
+            self.state: GameState | None = None
+            self.ops: list[DrawOp] = []
+            self.keys: list[tuple] = []
+            Renderer.__initialized = True
+
+    def draw(self, state: GameState | None, draw_frame: t.Callable[[], None]) -> None:
+        if not (shared.DIRTY_RECTS and state is not None and state.DIRTY_RECTS):
+            self.forget()
+            draw_frame()
+            pygame.display.flip()
+            return
+
+        ops = self.record(draw_frame)
+        keys = [op.key for op in ops]
+        if state is not self.state or any(
+            event.type in Renderer.FULL_REDRAW_EVENTS for event in shared.events
+        ):
+            rects = None
+        else:
+            rects = self.get_dirty_rects(keys)
+        # the old ops are kept until now so their surfaces can't be freed
+        # and have their ids reused by new ones
+        self.state, self.ops, self.keys = state, ops, keys
+
+        if rects is None:
+            self.replay(ops, [None])
+            pygame.display.flip()
+        elif rects:
+            self.replay(ops, rects)
+            pygame.display.update(rects)
+
+    def forget(self) -> None:
+        """Makes the next dirty rect frame a full redraw."""
+        self.state = None
+        self.ops = []
+        self.keys = []
+
+    def record(self, draw_frame: t.Callable[[], None]) -> list[DrawOp]:
+        ops: list[DrawOp] = []
+        screen = shared.screen
+        overlay = getattr(shared, "overlay", None)
+
+        shared.screen = DrawRecorder(screen, ops)  # type: ignore
+        if overlay is not None:
+            shared.overlay = DrawRecorder(  # type: ignore
+                overlay, ops, shared.LIGHTING_SCALE
+            )
+        try:
+            draw_frame()
+        finally:
+            shared.screen = screen
+            if overlay is not None:
+                shared.overlay = overlay
+        return ops
+
+    @staticmethod
+    @profiled("Renderer.replay")
+    def replay(ops: list[DrawOp], clips: list[pygame.Rect | None]) -> None:
+        """Replays `ops` clipped to each of `clips` in turn.
+
+        Smoothscales are done once, over their whole target, between the ops
+        before and after them, since scaling part of a surface doesn't give the
+        same pixels as that part of the whole scaled.
+        """
+        start = 0
+        for index, op in enumerate(ops):
+            if op.kind != "smoothscale":
+                continue
+            for clip in clips:
+                Renderer.replay_clipped(ops[start:index], clip)
+            pygame.transform.smoothscale(op.source, op.target.get_size(), op.target)
+            start = index + 1
+        for clip in clips:
+            Renderer.replay_clipped(ops[start:], clip)
+
+    @staticmethod
+    def replay_clipped(ops: list[DrawOp], clip: pygame.Rect | None) -> None:
+        targets = {op.target: op.scale for op in ops}
+        for target, scale in targets.items():
+            target.set_clip(Renderer.get_target_clip(clip, scale))
+        for op in ops:
+            if op.kind == "blit":
+                op.target.blit(op.source, op.dest, op.area, op.special_flags)
+            else:
+                op.target.fill(op.source, op.dest, op.special_flags)
+        for target in targets:
+            target.set_clip(None)
+
+    @staticmethod
+    def get_target_clip(clip: pygame.Rect | None, scale: int) -> pygame.Rect | None:
+        """Returns the area of a scaled target that `clip` on the screen needs."""
+        if clip is None or scale == 1:
+            return clip
+        left, top = clip.left // scale - 1, clip.top // scale - 1
+        right, bottom = -(-clip.right // scale) + 1, -(-clip.bottom // scale) + 1
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def get_dirty_rects(self, keys: list[tuple]) -> list[pygame.Rect] | None:
+        """Returns the regions that differ from the last frame.
+
+        None means the whole screen should be redrawn.
+        """
+        if keys == self.keys:
+            return []
+
+        previous, current = Counter(self.keys), Counter(keys)
+        changed = list((previous - current) + (current - previous))
+        if not changed:
+            # the same ops, drawn in a different order
+            changed = [
+                key
+                for old_key, new_key in zip(self.keys, keys)
+                if old_key != new_key
+                for key in (old_key, new_key)
+            ]
+
+        rects = self.merge_rects(
+            [pygame.Rect(key[4]) for key in changed if key[4][2] and key[4][3]]
+        )
+        screen_rect = shared.screen.get_rect()
+        if len(rects) > Renderer.MAX_RECTS:
+            rects = [rects[0].unionall(rects[1:])]
+        rects = [rect.clip(screen_rect) for rect in rects]
+
+        dirty_area = sum(rect.w * rect.h for rect in rects)
+        if dirty_area > screen_rect.w * screen_rect.h * Renderer.MAX_DIRTY_AREA:
+            return None
+        return rects
+
+    @staticmethod
+    def merge_rects(rects: list[pygame.Rect]) -> list[pygame.Rect]:
+        """Unions overlapping rects until none of them overlap."""
+        merged: list[pygame.Rect] = []
+        for rect in rects:
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect = rect.union(merged.pop(index))
+                index = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import os
+import typing as t
+from xml.etree import ElementTree
+
+import pytmx
+from pytmx.util_pygame import pygame_image_loader
+
+from . import shared
+from .common import get_path
+
+
+class RoomCache:
+    """Keeps parsed rooms around so entering a room doesn't reparse its .tmx.
+
+    Maps are kept in memory with their converted tile surfaces, keyed by room
+    id and the modification times of the .tmx and its tilesets. Rooms are also
+    compiled to disk (see `TiledMap.dump_compiled`), so a fresh start maps the
+    layer data straight from the file instead of parsing XML.
+    """
+
+    __instance = None
+    __rooms: dict[int, tuple[dict[str, float], pytmx.TiledMap]] = {}
+
+    ROOMS_DIR = "assets/data/rooms"
+    COMPILED_DIR = f"{ROOMS_DIR}/compiled"
+
+    def __new__(cls) -> RoomCache:
+        if cls.__instance is None:
+            cls.__instance = object.__new__(cls)
+        return cls.__instance
+
+    @staticmethod
+    def get_room_ids() -> list[int]:
+        return sorted(
+            int(name[:-4])
+            for name in os.listdir(get_path(RoomCache.ROOMS_DIR))
+            if name.endswith(".tmx") and name[:-4].isdigit()
+        )
+
+    @staticmethod
+    def get_room_path(room_id: int) -> str:
+        return get_path(f"{RoomCache.ROOMS_DIR}/{room_id}.tmx")
+
+    @staticmethod
+    def get_compiled_path(room_id: int) -> str:
+        return get_path(f"{RoomCache.COMPILED_DIR}/{room_id}.tmxc")
+
+    @staticmethod
+    def get_dependencies(path: str) -> dict[str, float]:
+        """Returns the mtimes of a room's .tmx and the tilesets it uses."""
+        dependencies = {path: os.path.getmtime(path)}
+        for tileset in ElementTree.parse(path).getroot().iter("tileset"):
+            source = tileset.get("source")
+            if source:
+                source = os.path.join(os.path.dirname(path), source)
+                dependencies[source] = os.path.getmtime(source)
+        return dependencies
+
+    @staticmethod
+    def is_fresh(dependencies: dict[str, float]) -> bool:
+        try:
+            return all(
+                os.path.getmtime(path) == mtime for path, mtime in dependencies.items()
+            )
+        except OSError:
+            return False
+
+    def get_room_map(self, room_id: int) -> pytmx.TiledMap:
+        cached = self.__rooms.get(room_id)
+        if cached is None or not self.is_fresh(cached[0]):
+            for _ in self.load_room(room_id):
+                pass
+        return self.__rooms[room_id][1]
+
+    def load_room(self, room_id: int) -> t.Iterator[None]:
+        """Loads a room into the cache, yielding between the slow parts so that
+        `RoomPreloader` can spread them over frames."""
+        compiled = self.load_compiled(room_id)
+        yield
+        if compiled is None:
+            path = self.get_room_path(room_id)
+            dependencies = self.get_dependencies(path)
+            yield
+            tiled_map = pytmx.TiledMap(
+                path, image_loader=pygame_image_loader, compact_layers=True
+            )
+            yield
+            self.save_compiled(room_id, dependencies, tiled_map)
+        else:
+            dependencies, tiled_map = compiled
+
+        self.__rooms[room_id] = dependencies, tiled_map
+
+    def has_room(self, room_id: int) -> bool:
+        return room_id in self.__rooms
+
+    def load_compiled(
+        self, room_id: int
+    ) -> tuple[dict[str, float], pytmx.TiledMap] | None:
+        path = self.get_compiled_path(room_id)
+        dirname = os.path.dirname(path)
+        try:
+            # dependencies are stored relative to the compiled file
+            dependencies = {
+                os.path.normpath(os.path.join(dirname, dependency)): mtime
+                for dependency, mtime in pytmx.read_compiled_metadata(path)[
+                    "dependencies"
+                ].items()
+            }
+            if not self.is_fresh(dependencies):
+                return None
+            tiled_map = pytmx.TiledMap.from_compiled(
+                path, image_loader=pygame_image_loader
+            )
+        except Exception:
+            # missing, truncated or written by an incompatible version
+            return None
+        return dependencies, tiled_map
+
+    def save_compiled(
+        self, room_id: int, dependencies: dict[str, float], tiled_map: pytmx.TiledMap
+    ) -> None:
+        # browser builds don't keep files between sessions
+        if shared.IS_WASM:
+            return
+
+        path = self.get_compiled_path(room_id)
+        dirname = os.path.dirname(path)
+        metadata = {
+            "dependencies": {
+                os.path.relpath(dependency, dirname): mtime
+                for dependency, mtime in dependencies.items()
+            }
+        }
+        try:
+            os.makedirs(dirname, exist_ok=True)
+            tiled_map.dump_compiled(f"{path}.tmp", metadata)
+            os.replace(f"{path}.tmp", path)
+        except (OSError, ValueError):
+            # read-only install, or a room the compiled format can't hold
+            return
+
+    def compile_rooms(self) -> None:
+        """Compiles every room ahead of time, e.g. before packaging a web build."""
+        for room_id in self.get_room_ids():
+            path = self.get_room_path(room_id)
+            self.save_compiled(
+                room_id,
+                self.get_dependencies(path),
+                pytmx.TiledMap(path, compact_layers=True),
+            )
+
+    def add_room(self, room_id: int, tiled_map: pytmx.TiledMap) -> None:
+        """Serves `tiled_map` for `room_id` until it's removed, e.g. a map built
+        in memory. It has no files to go stale."""
+        self.__rooms[room_id] = {}, tiled_map
+
+    def remove_room(self, room_id: int) -> None:
+        if room_id in self.__rooms:
+            del self.__rooms[room_id]
+
+
+if __name__ == "__main__":
+    RoomCache().compile_rooms()
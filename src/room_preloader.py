@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import time
+import typing as t
+
+from . import shared
+from .entities import Door
+from .enums import DoorDirection
+from .gamestate import GameStateManager
+from .grid import Grid, PreparedRoom
+from .room_cache import RoomCache
+
+
+class RoomPreloader:
+    """Prepares the first visits to the rooms behind the current room's
+    unlocked doors a step at a time, in the time between frames.
+
+    A room's map is loaded into `RoomCache`, then its Grid is built into
+    `Grid.PREPARED`: entities, background, path graph and static layers. So
+    walking through a door only swaps the room in (see `Grid.load`).
+    """
+
+    # steps take up to a few milliseconds, so don't start one with less left.
+    # Making one of a 30x30 room's surfaces takes about 10 on its own
+    MIN_IDLE_TIME = 0.004
+
+    def __init__(self) -> None:
+        self.room_ids = set(RoomCache.get_room_ids())
+        # the room whose map is being loaded and the map's remaining steps
+        self.loading: tuple[int, t.Iterator[None]] | None = None
+
+    def get_next_rooms(self) -> dict[int, DoorDirection]:
+        """Returns the rooms the player can walk into for the first time, with
+        the door they'd come in by."""
+        state = GameStateManager().state
+        if state is None or state.name != "PlayState":
+            return {}
+
+        rooms = {}
+        for entity in shared.entities:
+            if not isinstance(entity, Door) or entity.locked:
+                continue
+            room_id = shared.room_id + entity.room_delta
+            # the way out of the last room has no room behind it
+            if room_id in self.room_ids and room_id not in shared.entities_in_room:
+                rooms[room_id] = entity.next_door
+        return rooms
+
+    def step(self) -> bool:
+        """Runs one step of preparing a room, returns False if there's none to
+        prepare."""
+        rooms = self.get_next_rooms()
+        # rooms that can't be walked into anymore, or not through that door
+        for room_id, prepared in tuple(Grid.PREPARED.items()):
+            if rooms.get(room_id) != prepared.next_door:
+                del Grid.PREPARED[room_id]
+        # the player got there first, and it was loaded on the spot
+        if self.loading is not None and RoomCache().has_room(self.loading[0]):
+            self.loading = None
+
+        if self.loading is None:
+            for room_id, next_door in rooms.items():
+                if not RoomCache().has_room(room_id):
+                    self.loading = room_id, RoomCache().load_room(room_id)
+                    break
+                prepared = Grid.PREPARED.get(room_id)
+                if prepared is None:
+                    prepared = Grid.PREPARED[room_id] = PreparedRoom(
+                        room_id, next_door, RoomCache().get_room_map(room_id)
+                    )
+                if not prepared.done:
+                    prepared.step()
+                    return True
+            else:
+                return False
+
+        try:
+            next(self.loading[1])
+        except StopIteration:
+            self.loading = None
+        return True
+
+    def run(self, deadline: float) -> None:
+        """Prepares rooms until there's too little time left before `deadline`,
+        a `time.perf_counter` time."""
+        while time.perf_counter() + RoomPreloader.MIN_IDLE_TIME < deadline:
+            if not self.step():
+                return
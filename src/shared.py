@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 import sys
 import typing
 from pathlib import Path
@@ -14,6 +15,7 @@ if typing.TYPE_CHECKING:
     from .entities import Entity, Player
     from .graph import Graph
     from .monster_manager import Monster
+    from .spatial_hash import SpatialHash
 
 # Constants
 
@@ -25,8 +27,20 @@ TILE_SIDE = 64
 TILE_SIZE = (TILE_SIDE, TILE_SIDE)
 MAZE_ROOMS = (3, 7)
 COMB_LOCK_ROOMS = (2, 5, 4, 9)
+# raise for harder game modes, each extra monster spawns in its own room
+MONSTER_COUNT = 1
+# only redraw the parts of the screen that changed, in states that allow it
+DIRTY_RECTS = True
+# updates per second, the same however fast frames are drawn
+SIMULATION_RATE = 120
+# most frames drawn per second whatever the state asks for, 0 for no limit
+FRAME_CAP = 0
 
 IS_WASM = sys.platform == "emscripten"
+# lights are accumulated at 1/LIGHTING_SCALE of the screen resolution, then
+# smoothscaled up once. Lighting fill-rate drops with the square of it. Set the
+# LIGHTING_SCALE environment variable to pick it at startup
+LIGHTING_SCALE = max(int(os.environ.get("LIGHTING_SCALE", 4 if IS_WASM else 1)), 1)
 
 # Shared variables
 room_map: pytmx.TiledMap
@@ -37,13 +51,15 @@ clock: pygame.Clock
 events: list[pygame.event.Event]
 keys: list[bool]
 dt: float
+# seconds simulated since the game started
+sim_time: float = 0.0
 mouse_pos: pygame.Vector2
 camera_pos: pygame.Vector2
 room_id: int = 1
 entities: list[Entity]
-cells: list[pygame.Vector2]
+spatial_hash: SpatialHash
 player: Player
-monster: Monster
+monsters: list[Monster]
 next_door = DoorDirection.SOUTH
 overlay: pygame.Surface
 game_name: str = "The Horrible Hole of Hertfordshire"
@@ -51,7 +67,6 @@ entities_in_room: dict[int, list[Entity]] = {}
 reset: bool = False
 check_solve: bool = False
 graph: Graph
-update_graph: bool = True
 menu_audio: pygame.mixer.Sound | None = None
 game_audio: pygame.mixer.Sound | None = None
 monster_audio: pygame.mixer.Sound | None = None
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import typing as t
+from bisect import insort
+
+import pygame
+
+from ._types import Coordinate
+from .enums import MovementType
+
+if t.TYPE_CHECKING:
+    from .entities import Entity
+
+
+def to_coordinate(cell: pygame.Vector2 | t.Sequence[float]) -> Coordinate:
+    return int(cell[0]), int(cell[1])
+
+
+class SpatialHash:
+    """Maps (x, y) cells to the entities standing on them.
+
+    Entities are kept in the order they were added, so iterating a cell gives
+    the same order as iterating `shared.entities` would. Each cell is also
+    bucketed by `MovementType` for collision queries.
+    """
+
+    def __init__(self, entities: t.Iterable[Entity] = ()) -> None:
+        self._cells: dict[Coordinate, list[Entity]] = {}
+        self._buckets: dict[Coordinate, dict[MovementType, list[Entity]]] = {}
+        self._locations: dict[Entity, tuple[Coordinate, MovementType]] = {}
+        self._order: dict[Entity, int] = {}
+        self._next_order = 0
+        # cells whose occupants changed since the last `pop_changed_cells`
+        self.changed_cells: set[Coordinate] = set()
+        # entities added, removed or re-bucketed since `pop_changed_entities`
+        self.changed_entities: set[Entity] = set()
+
+        for entity in entities:
+            self.add(entity)
+
+    def __contains__(self, entity: Entity) -> bool:
+        return entity in self._locations
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def _insert(self, entity: Entity) -> None:
+        cell = to_coordinate(entity.cell)
+        movement_type = entity.movement_type
+        key = self._order.__getitem__
+
+        insort(self._cells.setdefault(cell, []), entity, key=key)
+        insort(
+            self._buckets.setdefault(cell, {}).setdefault(movement_type, []),
+            entity,
+            key=key,
+        )
+        self._locations[entity] = cell, movement_type
+        self.changed_cells.add(cell)
+        self.changed_entities.add(entity)
+
+    def _discard(self, entity: Entity) -> None:
+        cell, movement_type = self._locations.pop(entity)
+
+        entities = self._cells[cell]
+        entities.remove(entity)
+        buckets = self._buckets[cell]
+        buckets[movement_type].remove(entity)
+        if not buckets[movement_type]:
+            del buckets[movement_type]
+        if not entities:
+            del self._cells[cell]
+            del self._buckets[cell]
+        self.changed_cells.add(cell)
+        self.changed_entities.add(entity)
+
+    def add(self, entity: Entity) -> None:
+        if entity in self._locations:
+            return
+        self._order[entity] = self._next_order
+        self._next_order += 1
+        self._insert(entity)
+
+    def remove(self, entity: Entity) -> None:
+        if entity not in self._locations:
+            return
+        self._discard(entity)
+        del self._order[entity]
+
+    def replace(self, old: Entity, new: Entity) -> None:
+        """Swaps `old` for `new`, keeping the position `old` had in the order."""
+        if old not in self._locations:
+            self.add(new)
+            return
+        self._discard(old)
+        self._order[new] = self._order.pop(old)
+        self._insert(new)
+
+    def update(self, entity: Entity) -> None:
+        """Re-buckets an entity after its cell or movement type changed."""
+        location = self._locations.get(entity)
+        if location is None:
+            return
+        if location == (to_coordinate(entity.cell), entity.movement_type):
+            return
+        self._discard(entity)
+        self._insert(entity)
+
+    def get(self, cell: pygame.Vector2 | Coordinate) -> tuple[Entity, ...]:
+        return tuple(self._cells.get(to_coordinate(cell), ()))
+
+    def get_many(self, *cells: pygame.Vector2 | Coordinate) -> list[Entity]:
+        """Returns the entities on any of `cells`, in insertion order."""
+        coordinates = {to_coordinate(cell) for cell in cells}
+        entities = [
+            entity
+            for coordinate in coordinates
+            for entity in self._cells.get(coordinate, ())
+        ]
+        if len(coordinates) > 1:
+            entities.sort(key=self._order.__getitem__)
+        return entities
+
+    def query(
+        self, cell: pygame.Vector2 | Coordinate, *movement_types: MovementType
+    ) -> list[Entity]:
+        """Returns the entities on `cell` with any of `movement_types`."""
+        buckets = self._buckets.get(to_coordinate(cell))
+        if buckets is None:
+            return []
+        entities = [
+            entity
+            for movement_type in movement_types
+            for entity in buckets.get(movement_type, ())
+        ]
+        if len(movement_types) > 1:
+            entities.sort(key=self._order.__getitem__)
+        return entities
+
+    def has(
+        self, cell: pygame.Vector2 | Coordinate, *movement_types: MovementType
+    ) -> bool:
+        buckets = self._buckets.get(to_coordinate(cell))
+        if buckets is None:
+            return False
+        return any(movement_type in buckets for movement_type in movement_types)
+
+    def cells(self) -> t.Iterator[Coordinate]:
+        return iter(self._cells)
+
+    def pop_changed_cells(self) -> set[Coordinate]:
+        changed_cells = self.changed_cells
+        self.changed_cells = set()
+        return changed_cells
+
+    def pop_changed_entities(self) -> set[Entity]:
+        changed_entities = self.changed_entities
+        self.changed_entities = set()
+        return changed_entities
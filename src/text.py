@@ -0,0 +1,142 @@
+"""Text that's laid out once and drawn a glyph at a time, for the intro's
+typewriter effect."""
+
+from __future__ import annotations
+
+import pygame
+
+from ._types import ColorValue, Coordinate
+
+
+class GlyphAtlas:
+    """Every glyph drawn so far in one font and color, rendered once each and
+    packed in rows of a single surface. Get them from
+    `Loader().get_glyph_atlas`, so that they're shared."""
+
+    WIDTH = 1024
+
+    def __init__(self, font: pygame.Font, color: ColorValue) -> None:
+        self.font = font
+        self.color = color
+        self.row_height = font.get_height()
+        self.surface = pygame.Surface(
+            (GlyphAtlas.WIDTH, self.row_height), pygame.SRCALPHA
+        )
+        self.areas: dict[str, pygame.Rect] = {}
+        # where the next glyph goes
+        self.x, self.y = 0, 0
+
+    def get_area(self, char: str) -> pygame.Rect:
+        """Returns where `char` is in `surface`, rendering it if it's new."""
+        if char not in self.areas:
+            self.add(char)
+        return self.areas[char]
+
+    def add(self, char: str) -> None:
+        glyph = self.font.render(char, True, self.color)
+        if self.x + glyph.get_width() > GlyphAtlas.WIDTH:
+            self.x = 0
+            self.y += self.row_height
+        if self.y + self.row_height > self.surface.get_height():
+            self.grow()
+
+        self.surface.blit(glyph, (self.x, self.y))
+        self.areas[char] = glyph.get_rect(topleft=(self.x, self.y))
+        self.x += glyph.get_width()
+
+    def grow(self) -> None:
+        grown = pygame.Surface(
+            (GlyphAtlas.WIDTH, self.surface.get_height() * 2), pygame.SRCALPHA
+        )
+        grown.blit(self.surface, (0, 0))
+        self.surface = grown
+
+
+class TextLayout:
+    """Where each character of `text` goes, wrapped at spaces to fit in
+    `wraplength` close to how `Font.render` wraps, or only at newlines if
+    it's 0."""
+
+    def __init__(self, text: str, font: pygame.Font, wraplength: int = 0) -> None:
+        self.text = text
+        self.font = font
+        self.wraplength = wraplength
+        # what to draw for every character, whitespace included, so that
+        # text[:n] is glyphs[:n]. A character the font joins to the ones
+        # before it, as in a ligature or a kerned pair, redraws them together
+        self.glyphs: list[tuple[str, Coordinate]] = []
+        self.size = self.lay_out()
+
+    def get_width(self, text: str) -> int:
+        return self.font.size(text)[0]
+
+    def is_joined(self, pair: str) -> bool:
+        return self.get_width(pair) != sum(self.get_width(char) for char in pair)
+
+    def split_line(self, line: str, newline: bool) -> list[str]:
+        """Splits a line into the parts that fit in `wraplength`, breaking at
+        spaces where possible. Each part keeps the space it broke at."""
+        # like Font.render, the newline ending a line has to fit in it too
+        line += "\n" if newline else ""
+        parts = []
+        while self.wraplength and self.get_width(line) > self.wraplength:
+            end, space = 0, -1
+            while self.get_width(line[: end + 1]) <= self.wraplength:
+                if line[end] == " ":
+                    space = end
+                end += 1
+            # a word too long for a line of its own is broken anywhere
+            end = space + 1 if space >= 0 else max(end, 1)
+            parts.append(line[:end])
+            line = line[end:]
+        parts.append(line.removesuffix("\n") if newline else line)
+        return parts
+
+    def lay_out(self) -> Coordinate:
+        line_height = self.font.get_linesize()
+        y = 0
+        width = 0
+        lines = self.text.split("\n")
+        for line_index, line in enumerate(lines):
+            newline = line_index < len(lines) - 1
+            for part in self.split_line(line, newline):
+                for index, char in enumerate(part):
+                    pair = part[index - 1 : index + 1]
+                    if index and not pair.isspace() and self.is_joined(pair):
+                        cluster, pos = self.glyphs[-1]
+                        self.glyphs.append((cluster + char, pos))
+                    else:
+                        self.glyphs.append((char, (self.get_width(part[:index]), y)))
+                width = max(width, self.get_width(part))
+                y += line_height
+            if newline:
+                self.glyphs.append(("\n", (0, y)))
+        return max(width, self.wraplength), y
+
+
+class Typewriter:
+    """Draws `layout` onto its surface as its characters are revealed, each
+    one blitted from `atlas` once."""
+
+    def __init__(self, layout: TextLayout, atlas: GlyphAtlas) -> None:
+        self.layout = layout
+        self.atlas = atlas
+        self.surface = pygame.Surface(layout.size, pygame.SRCALPHA)
+        self.revealed = 0
+
+    def reveal(self, count: int) -> None:
+        """Shows the first `count` characters."""
+        count = min(count, len(self.layout.glyphs))
+        if count < self.revealed:
+            self.surface.fill((0, 0, 0, 0))
+            self.revealed = 0
+
+        for glyph, pos in self.layout.glyphs[self.revealed : count]:
+            if glyph.isspace():
+                continue
+            area = self.atlas.get_area(glyph)
+            if len(glyph) > 1:
+                # replaces the characters it's joined to
+                self.surface.fill((0, 0, 0, 0), area.move_to(topleft=pos))
+            self.surface.blit(self.atlas.surface, pos, area)
+        self.revealed = max(self.revealed, count)
@@ -141,6 +141,14 @@ class VictoryScreen(GameState):
         if self.player_rect.top >= shared.screen.get_rect().bottom:
             self.animation_done = True
 
+    def get_interpolated(self):
+        yield self, "player_rect"
+
+    def get_frame_rate(self) -> float | None:
+        if self.animation_done:
+            return None
+        return self.FRAME_RATE
+
     def draw(self) -> None:
         shared.screen.blit(self.bg, (0, 0))
         if self.animation_done: